@@ -1,21 +1,101 @@
 import streamlit as st
 import os
+import uuid
+import hashlib
+import threading
 import pandas as pd
 
+import metrics
 from simple_rag_system import MovieMindRAG
+from resources import get_session_rag, profile_cache
 
 st.set_page_config(page_title="🎬 MovieMind - Akıllı Film Öneri", page_icon="🎬", layout="centered")
 
+# MOVIEMIND_METRICS_PORT tanımlıysa /metrics adresinde Prometheus çıktısı sunulur
+metrics.start_exporter_from_env()
+
+def render_performance_panel():
+    """
+    Kenar çubuğunda aşama sürelerini ve sayaçları gösterir
+    """
+    with st.sidebar:
+        st.markdown("### ⏱️ Performans")
+        spans = metrics.registry.span_table()
+        if spans:
+            st.dataframe(pd.DataFrame(spans), hide_index=True)
+        else:
+            st.caption("Henüz ölçüm yok; bir indeks oluşturun veya öneri isteyin.")
+        counters = metrics.registry.snapshot()['counters']
+        if counters:
+            st.dataframe(pd.DataFrame([
+                {'metric': c['name'], 'labels': ', '.join(f"{k}={v}" for k, v in c['labels'].items()), 'value': c['value']}
+                for c in counters
+            ]), hide_index=True)
+        with st.expander("Son span'ler"):
+            st.json(list(metrics.registry.recent)[-20:])
+        # Kayıt süreç geneldir (diğer oturumların paneli ve Prometheus sayaçları); arayüzden sıfırlanmaz
+        st.download_button("Prometheus metni", metrics.registry.render_prometheus(), file_name="moviemind_metrics.txt", key="metrics_download")
+
+def dataframe_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Yüklenen verinin parmak izi; veri yüklenirken bir kez hesaplanır
+    """
+    return hashlib.sha1(pd.util.hash_pandas_object(df, index=False).values.tobytes()).hexdigest()
+
+def compute_profile_stats(df: pd.DataFrame) -> dict:
+    """
+    Profil Analizi özetleri; aynı veri için yeniden çalıştırmalarda profile_cache'ten gelir
+    """
+    top_movies = df[df['Rating'] >= 4.5].sort_values('Rating', ascending=False).head(5)
+    return {
+        'total': len(df),
+        'avg_rating': df['Rating'].mean(),
+        'high_rated': int((df['Rating'] >= 4.0).sum()),
+        'recent_films': int((df['Year'] >= 2020).sum()),
+        'top_movies': top_movies[['Name', 'Year', 'Rating']].to_dict('records'),
+    }
+
+def store_loaded_data(df: pd.DataFrame, export_tables: dict):
+    st.session_state.df = df
+    st.session_state.df_fingerprint = dataframe_fingerprint(df)
+    # İndeks LRU'dan atılıp yeniden kurulduğunda izleme listesi dışlaması da geri gelsin
+    st.session_state.export_tables = export_tables
+
 def main():
     st.title("🎬 MovieMind - Akıllı Film Öneri")
     st.caption("Letterboxd verilerinizle kişiselleştirilmiş film önerileri")
 
-    if 'rag' not in st.session_state:
-        st.session_state.rag = MovieMindRAG()
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+
+    # Ölçüm kaydı süreç geneldir; en az bir oturumda panel açıkken (ya da kalıcı açıldıysa) toplanır
+    show_performance = st.sidebar.checkbox("⏱️ Performans paneli", value=metrics.registry.always_on, key="performance_panel")
+    metrics.registry.set_viewer(st.session_state.session_id, show_performance)
+
+    # Model ve indeksler süreç genelinde paylaşılır; boşta kalan oturumların indeksleri bellekten atılır
+    session_id = st.session_state.session_id
+    rag = get_session_rag(session_id, lambda: MovieMindRAG(namespace=session_id))
+
+    # Çalıştırma boyunca oturum kullanımda sayılır; bu sırada LRU'dan atılırsa indeksi çalıştırma bitince bırakılır
+    with rag.in_use():
+        render_session(rag)
+
+    if show_performance:
+        render_performance_panel()
 
-    gemini_available = st.session_state.rag.setup_gemini()
+def render_session(rag: MovieMindRAG):
+    # Oturumun indeksi atıldıysa yüklü veriden yeniden kur (embedding'ler cache'ten gelir)
+    if rag.collection is None and st.session_state.get('df') is not None:
+        rag.setup_vector_database(rag.iter_movie_documents(st.session_state.df))
+        rag.set_export_tables(st.session_state.get('export_tables') or {})
+
+    # Yeni bir çalıştırma başladıysa önceki çalıştırmadan kalan Gemini akışını durdur
+    if st.session_state.get('generation_cancel') is not None:
+        st.session_state.generation_cancel.set()
+
+    gemini_available = rag.setup_gemini()
     if not gemini_available:
-        st.info("💡 Gemini API key yoksa sadece benzer film listesi gösterilir (sistem çalışır)")
+        st.info("💡 Gemini API key yoksa öneriler yerel öneri motoruyla, açıklamasız olarak üretilir")
 
     st.subheader("1) Veriyi Yükle")
     
@@ -28,37 +108,31 @@ def main():
             st.markdown("""
             1. **Letterboxd.com**'a giriş yapın
             2. **Settings** → **Data** → **Export** tıklayın
-            3. **ratings.csv** dosyasını indirin (zorunlu)
-            4. İsterseniz **reviews.csv** dosyasını da indirin (opsiyonel)
-            5. Bu dosyaları aşağıdan yükleyin
+            3. İndirdiğiniz **ZIP dosyasını** olduğu gibi yükleyin (izleme listesi vb. de okunur)
+            4. Ya da yalnızca **ratings.csv** (zorunlu) ve **reviews.csv** (opsiyonel) dosyalarını yükleyin
             """)
         
+        export_zip = st.file_uploader("Letterboxd export ZIP'ini yükleyin", type="zip", key="export_zip")
         ratings_file = st.file_uploader("ratings.csv dosyasını yükleyin", type="csv", key="ratings")
         reviews_file = st.file_uploader("reviews.csv dosyasını yükleyin (opsiyonel)", type="csv", key="reviews")
         
         if st.button("🔧 İndeks Oluştur / Yenile", type="primary", key="create_index_csv"):
-            if ratings_file is None:
-                st.error("En az ratings.csv dosyasını yüklemelisiniz!")
+            if export_zip is None and ratings_file is None:
+                st.error("Export ZIP'ini ya da en az ratings.csv dosyasını yüklemelisiniz!")
             else:
                 try:
-                    temp_folder = "temp_letterboxd"
-                    os.makedirs(temp_folder, exist_ok=True)
-                    
-                    with open(f"{temp_folder}/ratings.csv", "wb") as f:
-                        f.write(ratings_file.getbuffer())
-                    
-                    if reviews_file is not None:
-                        with open(f"{temp_folder}/reviews.csv", "wb") as f:
-                            f.write(reviews_file.getbuffer())
-                    
-                    df = st.session_state.rag.load_letterboxd_data(temp_folder)
-                    docs = st.session_state.rag.create_movie_documents(df)
-                    count = st.session_state.rag.setup_vector_database(docs)
+                    # Yüklenen dosyalar bellekten okunur, diske yazılmaz
+                    source = export_zip if export_zip is not None else {'ratings.csv': ratings_file, 'reviews.csv': reviews_file}
+                    progress_bar = st.progress(0.0, text="İndeksleniyor...")
+                    df, count = rag.ingest_letterboxd(
+                        source,
+                        progress_callback=lambda fraction: progress_bar.progress(fraction, text=f"İndeksleniyor... %{fraction * 100:.0f}")
+                    )
+                    progress_bar.empty()
                     st.success(f"✅ {count} film indekse eklendi")
-                    st.session_state.df = df
-                    
-                    import shutil
-                    shutil.rmtree(temp_folder, ignore_errors=True)
+                    sync = rag.last_sync_stats
+                    st.caption(f"Yeni: {sync.get('added', 0)} · Güncellenen: {sync.get('updated', 0)} · Silinen: {sync.get('deleted', 0)} · Değişmeyen: {sync.get('unchanged', 0)}")
+                    store_loaded_data(df, rag.export_tables)
                     
                 except Exception as e:
                     st.error(f"Hata: {e}")
@@ -70,36 +144,42 @@ def main():
                 st.error("`letterboxd/` klasörü bulunamadı. ratings.csv (ve varsa reviews.csv) bu klasörde olmalı.")
             else:
                 try:
-                    df = st.session_state.rag.load_letterboxd_data(letterboxd_folder)
-                    docs = st.session_state.rag.create_movie_documents(df)
-                    count = st.session_state.rag.setup_vector_database(docs)
+                    progress_bar = st.progress(0.0, text="İndeksleniyor...")
+                    df, count = rag.ingest_letterboxd(
+                        letterboxd_folder,
+                        progress_callback=lambda fraction: progress_bar.progress(fraction, text=f"İndeksleniyor... %{fraction * 100:.0f}")
+                    )
+                    progress_bar.empty()
                     st.success(f"✅ {count} film indekse eklendi")
-                    st.session_state.df = df
+                    sync = rag.last_sync_stats
+                    st.caption(f"Yeni: {sync.get('added', 0)} · Güncellenen: {sync.get('updated', 0)} · Silinen: {sync.get('deleted', 0)} · Değişmeyen: {sync.get('unchanged', 0)}")
+                    store_loaded_data(df, rag.export_tables)
                 except Exception as e:
                     st.error(f"Hata: {e}")
 
     if 'df' in st.session_state and st.session_state.df is not None:
         st.subheader("📊 Profil Analizi")
         df = st.session_state.df
+        if st.session_state.get('df_fingerprint') is None:
+            st.session_state.df_fingerprint = dataframe_fingerprint(df)
+        # Sorgu kutusundaki her tuş vuruşu yeniden çalıştırma demektir; özetler veri başına bir kez hesaplanır
+        stats = profile_cache.get_or_create(st.session_state.df_fingerprint, lambda: compute_profile_stats(df))
         
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("🎬 Toplam Film", len(df))
+            st.metric("🎬 Toplam Film", stats['total'])
         with col2:
-            avg_rating = df['Rating'].mean()
-            st.metric("⭐ Ortalama Puan", f"{avg_rating:.1f}/5")
+            st.metric("⭐ Ortalama Puan", f"{stats['avg_rating']:.1f}/5")
         with col3:
-            high_rated = len(df[df['Rating'] >= 4.0])
-            st.metric("🔥 Yüksek Puanlı", high_rated)
+            st.metric("🔥 Yüksek Puanlı", stats['high_rated'])
         with col4:
-            recent_films = len(df[df['Year'] >= 2020])
-            st.metric("📅 Son 4 Yıl", recent_films)
+            st.metric("📅 Son 4 Yıl", stats['recent_films'])
         
-        if len(df) > 0:
+        if stats['total'] > 0:
             st.markdown("### 🌟 En Sevdiğin Filmler")
-            top_movies = df[df['Rating'] >= 4.5].sort_values('Rating', ascending=False).head(5)
+            top_movies = stats['top_movies']
             if len(top_movies) > 0:
-                for _, movie in top_movies.iterrows():
+                for movie in top_movies:
                     st.write(f"• **{movie['Name']}** ({movie['Year']}) - {movie['Rating']}/5")
             else:
                 st.write("Henüz 4.5+ puan verdiğin film yok")
@@ -116,19 +196,38 @@ def main():
     if st.button("🔍 Öneri Getir", type="primary", key="get_recommendations"):
         if not query.strip():
             st.warning("⚠️ Lütfen prompt kısmına film türü yazın!")
-        elif not st.session_state.rag.collection:
+        elif not rag.collection:
             st.error("Önce veriyi yükleyin!")
         else:
+            cancel_event = threading.Event()
+            st.session_state.generation_cancel = cancel_event
+            st.button("⏹ Durdur", key="cancel_generation")
+
+            # Gemini yanıtı geldikçe ekrana yazılır
+            stream_placeholder = st.empty()
+            streamed = []
+
+            def on_token(token):
+                streamed.append(token)
+                stream_placeholder.markdown(''.join(streamed))
+
             with st.spinner("Aranıyor..."):
                 filters = {
                     "min_rating": 0.0,
                     "year_min": year_min,
                     "only_unwatched": True
                 }
-                result = st.session_state.rag.get_recommendations(query, filters)
+                result = rag.get_recommendations(query, filters, on_token=on_token, cancel_event=cancel_event)
+            stream_placeholder.empty()
             
             if result.get('success'):
                 st.markdown("## 🎬 Film Önerileri")
+                if 'local_ms' in result:
+                    st.caption(f"Yerel öneri motoru · {result['local_ms']} ms")
+                if 'prompt_tokens' in result:
+                    st.caption(f"Prompt ≈ {result['prompt_tokens']} token · {result['llm_calls']} LLM çağrısı · {result['generation_seconds']} sn")
+                if result.get('rerank_error'):
+                    st.caption(f"Gemini yeniden sıralaması kullanılamadı, yerel öneriler gösteriliyor: {result['rerank_error']}")
                 
                 recommendations_text = result['recommendations']
                 
@@ -0,0 +1,247 @@
+"""
+Çok sayıda kullanıcı ve sorgu için önerileri arayüz olmadan toplu üreten komut satırı aracı.
+
+Her satırı bir iş olan JSONL dosyası okunur (id ve filters isteğe bağlıdır):
+    {"id": "ayse-korku", "folder": "exports/ayse", "query": "korku", "filters": {"year_min": 2000}}
+
+"folder" bir export klasörü ya da export ZIP'i olabilir. İşler thread havuzunda eşzamanlı çalışır. Aynı export klasörünün indeksi bir kez kurulur,
+o klasörün bütün işleri bitince bellekten atılır. Gemini çağrıları ortak bir token kovasıyla
+hız sınırlanır. Biten her iş sonuç dosyasına hemen yazılır; yarıda kalan çalıştırma aynı
+komutla sürdürülür ve başarıyla bitmiş işler atlanır.
+
+Kullanım:
+    python batch_recommend.py jobs.jsonl --out sonuclar.jsonl --workers 8 --rpm 60
+    python batch_recommend.py jobs.jsonl --out sonuclar.jsonl --llm stub --embedder hash   # çevrimdışı
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List
+
+import resources
+from simple_rag_system import MovieMindRAG
+from embedders import load_embedder
+from generation import StubGenerativeModel
+
+DEFAULT_FILTERS = {"min_rating": 0.0, "year_min": 1900, "only_unwatched": True}
+
+RESULT_FIELDS = (
+    'recommendations', 'error', 'engine', 'candidates', 'cached',
+    'prompt_tokens', 'llm_calls', 'generation_seconds', 'rerank_error',
+)
+
+
+def job_id(job: Dict) -> str:
+    """
+    İşin kimliği: verilmişse 'id', yoksa klasör/sorgu/filtrelerin hash'i (dosyadaki sıradan bağımsız)
+    """
+    if job.get('id') is not None:
+        return str(job['id'])
+    payload = json.dumps(
+        {key: job.get(key) for key in ('folder', 'query', 'filters')}, sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def read_jobs(path: str) -> List[Dict]:
+    jobs = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            job = json.loads(line)
+            if not job.get('folder') or not job.get('query'):
+                raise ValueError(f"{path}:{line_no}: 'folder' ve 'query' alanları zorunlu")
+            job['id'] = job_id(job)
+            jobs.append(job)
+    return jobs
+
+
+def completed_ids(path: str) -> set:
+    """
+    Önceki çalıştırmalarda başarıyla biten işlerin kimlikleri; yarım yazılmış satırlar yok sayılır
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get('success'):
+                done.add(record['id'])
+    return done
+
+
+class CheckpointWriter:
+    """
+    Sonuçları satır satır ekler ve her satırdan sonra diske zorlar;
+    kesinti anında en fazla yazılmakta olan satır kaybolur
+    """
+
+    def __init__(self, path: str):
+        # Önceki çalıştırma satır ortasında kesildiyse yeni kayıt o satıra yapışmasın
+        needs_newline = False
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b'\n'
+        self._file = open(path, 'a', encoding='utf-8')
+        if needs_newline:
+            self._file.write('\n')
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class IndexPool:
+    """
+    Export klasörü başına tek MovieMindRAG. İndeks klasörün ilk işinde kurulur (aynı klasörün
+    diğer işleri bu sırada bekler), sonraki işler yeniden kullanır; klasörün son işi bitince
+    indeks bırakılır. Kurulamayan klasörün hatası saklanır ve kalan işleri hemen düşürür.
+    """
+
+    def __init__(self, jobs: List[Dict], factory: Callable[[str], MovieMindRAG]):
+        self.factory = factory
+        self._remaining = Counter(os.path.realpath(job['folder']) for job in jobs)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.built = 0
+
+    def acquire(self, folder: str) -> MovieMindRAG:
+        key = os.path.realpath(folder)
+        with self._lock:
+            entry = self._entries.setdefault(key, {'lock': threading.Lock(), 'rag': None, 'error': None})
+        with entry['lock']:
+            if entry['rag'] is None and entry['error'] is None:
+                try:
+                    rag = self.factory(key)
+                    rag.ingest_letterboxd(key)
+                    entry['rag'] = rag
+                    self.built += 1
+                except Exception as e:
+                    entry['error'] = e
+        if entry['error'] is not None:
+            raise entry['error']
+        return entry['rag']
+
+    def release(self, folder: str):
+        key = os.path.realpath(folder)
+        with self._lock:
+            self._remaining[key] -= 1
+            if self._remaining[key] > 0:
+                return
+            entry = self._entries.pop(key, None)
+        if entry is not None and entry['rag'] is not None:
+            entry['rag'].release()
+
+
+def run_job(job: Dict, pool: IndexPool) -> Dict:
+    started = time.perf_counter()
+    try:
+        rag = pool.acquire(job['folder'])
+        filters = {**DEFAULT_FILTERS, **(job.get('filters') or {})}
+        result = rag.get_recommendations(job['query'], filters)
+    except Exception as e:
+        result = {'success': False, 'error': f"{type(e).__name__}: {e}"}
+    finally:
+        pool.release(job['folder'])
+
+    record = {
+        'id': job['id'],
+        'folder': job['folder'],
+        'query': job['query'],
+        'filters': job.get('filters') or {},
+        'success': bool(result.get('success')),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    record.update({key: result[key] for key in RESULT_FIELDS if key in result})
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("jobs", help="iş tanımlarını içeren JSONL dosyası")
+    parser.add_argument("--out", required=True, help="sonuçların eklendiği JSONL dosyası (checkpoint)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rpm", type=float, help="dakikadaki en fazla Gemini çağrısı (varsayılan GEMINI_RATE_LIMIT_RPM)")
+    parser.add_argument("--burst", type=float, help="hız sınırına takılmadan art arda yapılabilecek çağrı sayısı")
+    parser.add_argument("--llm", choices=["gemini", "stub"], default="gemini")
+    parser.add_argument("--embedder", choices=["hash", "model", "torch", "onnx", "onnx-int8"])
+    args = parser.parse_args()
+
+    jobs = read_jobs(args.jobs)
+    done = completed_ids(args.out)
+    pending = {}
+    for job in jobs:
+        if job['id'] not in done:
+            pending.setdefault(job['id'], job)
+    # Aynı klasörün işleri art arda gelsin ki indeksi erken bırakılabilsin
+    pending = sorted(pending.values(), key=lambda job: os.path.realpath(job['folder']))
+    print(f"{len(jobs)} iş, {len(jobs) - len(pending)} tanesi önceki çalıştırmada tamamlanmış, {len(pending)} çalıştırılacak")
+    if not pending:
+        return
+
+    rate_limiter = resources.TokenBucket(args.rpm / 60, capacity=args.burst) if args.rpm else resources.gemini_rate_limiter
+    # Tüm klasörler tek embedder'ı (ve onun tek encode süreç havuzunu) paylaşır
+    embedder = load_embedder(args.embedder) if args.embedder else None
+
+    def create_rag(folder: str) -> MovieMindRAG:
+        rag = MovieMindRAG(namespace=folder)
+        if embedder is not None:
+            rag.embedding_model = embedder
+        if args.llm == "stub":
+            rag.gemini_model = StubGenerativeModel()
+        elif not rag.setup_gemini():
+            print("Uyarı: GEMINI_API_KEY yok, öneriler yalnızca yerel motorla üretilecek", file=sys.stderr)
+        rag.rate_limiter = rate_limiter
+        return rag
+
+    pool = IndexPool(pending, create_rag)
+    writer = CheckpointWriter(args.out)
+    executor = ThreadPoolExecutor(max_workers=args.workers)
+    started = time.perf_counter()
+    failures = 0
+    try:
+        futures = [executor.submit(run_job, job, pool) for job in pending]
+        for finished, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            writer.write(record)
+            failures += not record['success']
+            status = "✓" if record['success'] else f"✗ {record.get('error', '')}"
+            print(f"[{finished}/{len(pending)}] {record['id']} {record['seconds']:.2f} sn {status}")
+    except KeyboardInterrupt:
+        executor.shutdown(wait=False, cancel_futures=True)
+        writer.close()
+        print("Durduruldu; aynı komutla kaldığı yerden devam edebilirsiniz.", file=sys.stderr)
+        sys.exit(130)
+    executor.shutdown()
+    writer.close()
+
+    print(
+        f"{len(pending) - failures} başarılı, {failures} başarısız · {pool.built} indeks · "
+        f"{time.perf_counter() - started:.1f} sn"
+    )
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Embedding backend'lerinin (torch fp32 / onnx / onnx-int8) hız ve geri getirme kalitesi karşılaştırması.
+
+Kullanıcının kendi export'undan örneklenen dokümanlar her backend ile encode edilir;
+saniyede encode edilen metin, tek sorgu gecikmesi ve fp32 modelin ilk k sonucuna göre
+recall@k raporlanır. Kaliteyi koruyan en hızlı backend MOVIEMIND_EMBEDDING_BACKEND ile seçilir.
+
+ONNX backend'leri için: pip install "sentence-transformers[onnx]"
+
+Kullanım:
+    python benchmarks/bench_embedding_backends.py --folder letterboxd --sample 1000 --k 10
+"""
+import os
+import sys
+import json
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simple_rag_system import MovieMindRAG
+from embedders import compare_embedders, load_embedder
+
+QUERIES = ["aksiyon", "korku", "bilim kurgu", "komedi", "dram", "romantik", "gerilim", "Interstellar gibi"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folder", default="letterboxd")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--sample", type=int, default=1000, help="örneklenecek doküman sayısı")
+    parser.add_argument("--doc-queries", type=int, default=50, help="sorgu olarak da kullanılacak doküman sayısı")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_path")
+    args = parser.parse_args()
+
+    rag = MovieMindRAG()
+    texts = [doc['text'] for doc in rag.create_movie_documents(rag.load_letterboxd_data(args.folder))]
+    rng = random.Random(args.seed)
+    documents = rng.sample(texts, min(args.sample, len(texts)))
+    queries = [variant for query in QUERIES for variant in rag.augment_query(query)]
+    queries += rng.sample(documents, min(args.doc_queries, len(documents)))
+
+    embedders = {}
+    for backend in args.backends:
+        embedder = load_embedder(backend)
+        embedder.get_model()
+        if embedder.active_backend != backend:
+            print(f"{backend}: yüklenemedi, atlanıyor ({embedder.backend_error})")
+            continue
+        embedders[backend] = embedder
+
+    results = compare_embedders(embedders, documents, queries, k=args.k, reference=args.backends[0])
+
+    print(f"{len(documents)} doküman, {len(queries)} sorgu, referans={args.backends[0]}")
+    print(f"{'backend':<12}{'metin/s':>10}{'sorgu ms':>10}{'recall@' + str(args.k):>12}")
+    for row in results:
+        print(f"{row['backend']:<12}{row['texts_per_second']:>10.1f}{row['query_ms']:>10.2f}{row.get('recall_at_k', float('nan')):>12.4f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Süreç havuzlu embedding yürütücüsünün çekirdek sayısıyla ölçeklenmesi.
+
+Sentetik bir export'tan augment edilmiş doküman metinleri üretir ve her işçi sayısı için
+(ilk çağrıdaki havuz açılışı hariç) saniyede encode edilen metin sayısını ölçer.
+
+Kullanım:
+    python benchmarks/bench_embedding_workers.py --ratings 10000 --workers 1 2 4 8 --embedder model
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simple_rag_system import MovieMindRAG
+from embedders import load_embedder
+from embedding_executor import EmbeddingExecutor
+from synthetic_export import generate_export
+
+
+def build_texts(n_ratings: int, seed: int):
+    with tempfile.TemporaryDirectory() as folder:
+        generate_export(folder, n_ratings, seed=seed)
+        rag = MovieMindRAG()
+        documents = rag.create_movie_documents(rag.load_letterboxd_data(folder))
+    return [doc['text'] for doc in documents]
+
+
+def run(texts, worker_counts, embedder: str, repeat: int):
+    model = load_embedder(embedder)
+    results = []
+    reference = None
+    for workers in worker_counts:
+        executor = EmbeddingExecutor(model, workers=workers, min_parallel_texts=1)
+        try:
+            # Havuz açılışı ve model yüklemesi ölçüme dahil edilmez
+            start = time.perf_counter()
+            executor.encode(texts[:max(workers * 8, 64)])
+            warmup_seconds = time.perf_counter() - start
+
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                embeddings = executor.encode(texts)
+                timings.append(time.perf_counter() - start)
+        finally:
+            executor.close()
+
+        if reference is None:
+            reference = embeddings
+        seconds = min(timings)
+        results.append({
+            'workers': workers,
+            'texts': len(texts),
+            'batch_size': executor.auto_batch_size(texts),
+            'warmup_seconds': round(warmup_seconds, 3),
+            'seconds': round(seconds, 3),
+            'texts_per_second': round(len(texts) / seconds, 1),
+            'max_abs_diff': float(np.abs(np.asarray(embeddings) - np.asarray(reference)).max()),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ratings", type=int, default=10000)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--embedder", choices=["hash", "model", "torch", "onnx", "onnx-int8"], default="hash")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_path")
+    args = parser.parse_args()
+
+    texts = build_texts(args.ratings, args.seed)
+    results = run(texts, args.workers, args.embedder, args.repeat)
+
+    baseline = results[0]['texts_per_second']
+    print(f"{os.cpu_count()} çekirdek, {len(texts)} metin, embedder={args.embedder}")
+    print(f"{'işçi':>6}{'batch':>7}{'ısınma s':>10}{'süre s':>9}{'metin/s':>11}{'hızlanma':>10}{'maks fark':>11}")
+    for row in results:
+        print(
+            f"{row['workers']:>6}{row['batch_size']:>7}{row['warmup_seconds']:>10.2f}{row['seconds']:>9.2f}"
+            f"{row['texts_per_second']:>11.1f}{row['texts_per_second'] / baseline:>10.2f}{row['max_abs_diff']:>11.2e}"
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({'cpu_count': os.cpu_count(), 'embedder': args.embedder, 'results': results}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
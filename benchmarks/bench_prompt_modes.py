@@ -0,0 +1,98 @@
+"""
+"full" ve "bounded" prompt modlarının prompt token sayısı ve uçtan uca üretim süresi karşılaştırması.
+Kütüphane boyutu büyüdükçe full modda prompt doğrusal büyür, bounded modda sabit kalır.
+
+Kullanım:
+    python benchmarks/bench_prompt_modes.py --sizes 100 500 2000 --llm stub
+    python benchmarks/bench_prompt_modes.py --sizes 2000 --llm gemini   # GEMINI_API_KEY gerekir
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simple_rag_system import MovieMindRAG
+from generation import StubGenerativeModel
+from resources import TTLCache
+
+QUERIES = ["aksiyon", "bilim kurgu", "korku", "komedi", "dram"]
+
+
+def synthetic_watched(size: int):
+    """
+    size adet izlenmiş film; stub modelin aday listesinin yarısı da kütüphanede yer alır
+    """
+    films = [(name, year) for name, year in StubGenerativeModel.CANDIDATES[::2]]
+    films += [(f"Sentetik Film {i}", 1950 + i % 75) for i in range(max(0, size - len(films)))]
+    return [
+        {
+            'id': f"{name}_{year}",
+            'text': f"Film: {name} ({year})",
+            'metadata': {'title': name, 'year': year, 'rating': float(1 + i % 5), 'watched': True, 'uri': ''}
+        }
+        for i, (name, year) in enumerate(films[:size])
+    ]
+
+
+def run(sizes, llm: str):
+    rag = MovieMindRAG()
+    if llm == "stub":
+        rag.gemini_model = StubGenerativeModel()
+    elif not rag.setup_gemini():
+        raise SystemExit("GEMINI_API_KEY bulunamadı")
+    # Her çağrı gerçekten modele gitsin
+    rag.response_cache = TTLCache(max_size=0)
+
+    results = []
+    for size in sizes:
+        documents = synthetic_watched(size)
+        rag.rebuild_watched_index(documents)
+        reference = [doc['metadata'] for doc in documents[:50]]
+        for mode in ("full", "bounded"):
+            rag.prompt_mode = mode
+            tokens, seconds, calls, filtered, successes = 0, 0.0, 0, 0, 0
+            for query in QUERIES:
+                start = time.perf_counter()
+                result = rag.generate_recommendations_from_watched(query, reference)
+                seconds += time.perf_counter() - start
+                tokens += result.get('prompt_tokens', 0)
+                calls += result.get('llm_calls', 0)
+                filtered += result.get('filtered_out', 0)
+                successes += int(result.get('success', False))
+            results.append({
+                'library_size': size,
+                'mode': mode,
+                'prompt_tokens': tokens // len(QUERIES),
+                'llm_calls': calls / len(QUERIES),
+                'filtered_out': filtered / len(QUERIES),
+                'latency_ms': round(seconds / len(QUERIES) * 1000, 2),
+                'success_rate': successes / len(QUERIES),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--llm", choices=["stub", "gemini"], default="stub")
+    parser.add_argument("--json", dest="json_path")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.llm)
+    print(f"{'kütüphane':>10}{'mod':>9}{'prompt token':>14}{'LLM çağrısı':>13}{'elenen':>8}{'süre ms':>10}")
+    for row in results:
+        print(
+            f"{row['library_size']:>10}{row['mode']:>9}{row['prompt_tokens']:>14}{row['llm_calls']:>13.1f}"
+            f"{row['filtered_out']:>8.1f}{row['latency_ms']:>10.2f}"
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
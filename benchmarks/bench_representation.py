@@ -0,0 +1,118 @@
+"""
+Doküman temsillerinin (variants / pooled-mean / pooled-max / multivector) indeks boyutu,
+indeks kurma süresi ve arama gecikmesi karşılaştırması.
+
+Varsayılan olarak çevrimdışı hashing embedder'ı kullanılır; gerçek model için --embedder model.
+
+Kullanım:
+    python benchmarks/bench_representation.py --folder letterboxd --repeat 10 --json sonuc.json
+    python benchmarks/bench_representation.py --embedder onnx
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simple_rag_system import MovieMindRAG
+from embedding_cache import EmbeddingCache
+from embedders import load_embedder
+from resources import TTLCache
+
+MODES = [
+    ("variants", "mean"),
+    ("pooled", "mean"),
+    ("pooled", "max"),
+    ("multivector", "mean"),
+]
+
+QUERIES = ["aksiyon", "korku", "bilim kurgu", "komedi", "dram", "Interstellar gibi"]
+
+
+def repeat_library(df: pd.DataFrame, repeat: int) -> pd.DataFrame:
+    """
+    Kütüphaneyi, başlıkları farklılaştırarak repeat kat büyütür
+    """
+    if repeat <= 1:
+        return df
+    copies = []
+    for i in range(repeat):
+        copy = df.copy()
+        if i:
+            copy['Name'] = copy['Name'].astype(str) + f" #{i}"
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def run(folder: str, repeat: int, query_rounds: int, embedder: str = "hash"):
+    rag = MovieMindRAG()
+    rag.vector_backend = "numpy"
+    rag.embedding_model = load_embedder(embedder)
+    # Temsiller arasında arama süresi karşılaştırılır; sonuç cache'i kapalı
+    rag.search_cache = TTLCache(max_size=0)
+    df = repeat_library(rag.load_letterboxd_data(folder), repeat)
+    documents = rag.create_movie_documents(df)
+
+    results = []
+    for representation, pooling in MODES:
+        rag.document_representation = representation
+        rag.pooling = pooling
+        with tempfile.TemporaryDirectory() as cache_dir:
+            # Her temsil soğuk embedding cache ile ölçülür
+            rag.embedding_cache = EmbeddingCache(cache_dir, rag.embedding_model_name)
+
+            start = time.perf_counter()
+            rows = rag.setup_vector_database(documents, incremental=False)
+            build_seconds = time.perf_counter() - start
+
+            for query in QUERIES:
+                rag.search_movies(query, n_results=10)
+            start = time.perf_counter()
+            for _ in range(query_rounds):
+                for query in QUERIES:
+                    rag.search_movies(query, n_results=10)
+            search_ms = (time.perf_counter() - start) / (query_rounds * len(QUERIES)) * 1000
+
+        results.append({
+            'representation': representation if representation != "pooled" else f"pooled-{pooling}",
+            'films': int(len(df)),
+            'rows': rows,
+            'vectors': rag.collection.vector_count(),
+            'index_bytes': rag.collection.nbytes(),
+            'build_seconds': round(build_seconds, 4),
+            'search_ms': round(search_ms, 4),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folder", default="letterboxd")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--query-rounds", type=int, default=50)
+    parser.add_argument("--embedder", choices=["hash", "model", "torch", "onnx", "onnx-int8"], default="hash")
+    parser.add_argument("--json", dest="json_path")
+    args = parser.parse_args()
+
+    results = run(args.folder, args.repeat, args.query_rounds, args.embedder)
+
+    baseline = results[0]
+    print(f"{'temsil':<14}{'satır':>8}{'vektör':>9}{'indeks KB':>11}{'kurma s':>10}{'arama ms':>10}{'boyut x':>9}")
+    for row in results:
+        print(
+            f"{row['representation']:<14}{row['rows']:>8}{row['vectors']:>9}{row['index_bytes'] / 1024:>11.1f}"
+            f"{row['build_seconds']:>10.3f}{row['search_ms']:>10.3f}{baseline['index_bytes'] / max(row['index_bytes'], 1):>9.2f}"
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+ingest -> index -> search -> recommend hattının tekrarlanabilir benchmark'ı.
+
+Sentetik Letterboxd exportları üretir, her aşamanın süresini ve tepe bellek kullanımını
+ölçer; sonuçları commit'ler arasında karşılaştırılabilir JSON olarak yazar. Varsayılan
+olarak çevrimdışı çalışır (hashing embedder + yerel stub LLM).
+
+Kullanım:
+    python benchmarks/run_pipeline.py --sizes 1000 10000 50000 --json sonuc.json
+    python benchmarks/run_pipeline.py --sizes 1000 --compare onceki.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simple_rag_system import MovieMindRAG
+from embedding_cache import EmbeddingCache
+from embedders import load_embedder
+from generation import StubGenerativeModel
+from resources import TTLCache
+from synthetic_export import generate_export
+
+QUERIES = ["aksiyon", "korku", "bilim kurgu", "komedi", "dram", "Interstellar gibi"]
+
+
+class StageTimer:
+    """
+    Her aşamanın duvar saati süresini ve tracemalloc ile tepe bellek kullanımını kaydeder
+    """
+
+    def __init__(self, size: int, trace_memory: bool):
+        self.size = size
+        self.trace_memory = trace_memory
+        self.rows = []
+
+    def run(self, stage: str, func, repeat: int = 1, **extra):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        seconds = (time.perf_counter() - start) / repeat
+        row = {'size': self.size, 'stage': stage, 'seconds': round(seconds, 6), **extra}
+        if self.trace_memory:
+            row['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+        self.rows.append(row)
+        return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def run_size(size: int, args, work_dir: str):
+    export_dir = generate_export(os.path.join(work_dir, f"export_{size}"), size, args.review_ratio, args.seed)
+
+    rag = MovieMindRAG()
+    rag.vector_backend = args.backend
+    rag.document_representation = args.representation
+    rag.embedding_model = load_embedder(args.embedder)
+    # Soğuk embedding cache: her boyut aynı koşullarda ölçülür
+    rag.embedding_cache = EmbeddingCache(os.path.join(work_dir, f"cache_{size}"), rag.embedding_model_name)
+    rag.gemini_model = StubGenerativeModel()
+    rag.response_cache = TTLCache(max_size=0)
+    rag.search_cache = TTLCache(max_size=0)
+
+    timer = StageTimer(size, args.trace_memory)
+    df = timer.run("load_letterboxd_data", lambda: rag.load_letterboxd_data(export_dir))
+    documents = timer.run("create_movie_documents", lambda: rag.create_movie_documents(df), documents=None)
+    timer.rows[-1]['documents'] = len(documents)
+    timer.run("setup_vector_database", lambda: rag.setup_vector_database(documents, incremental=False))
+    timer.run("setup_vector_database_noop", lambda: rag.setup_vector_database(documents))
+
+    # Sorgu embedding'leri ısındıktan sonra saf arama süresi ölçülür
+    for query in QUERIES:
+        rag.search_movies(query, n_results=10)
+    timer.run(
+        "search_movies",
+        lambda: [rag.search_movies(query, n_results=10) for query in QUERIES],
+        repeat=args.repeat
+    )
+    timer.rows[-1]['seconds'] = round(timer.rows[-1]['seconds'] / len(QUERIES), 6)
+
+    # Tekrarlanan sorgular: aynı indeks sürümünde sonuç cache'ten döner
+    rag.search_cache = TTLCache(max_size=len(QUERIES))
+    for query in QUERIES:
+        rag.search_movies(query, n_results=10)
+    timer.run(
+        "search_movies_cached",
+        lambda: [rag.search_movies(query, n_results=10) for query in QUERIES],
+        repeat=args.repeat
+    )
+    timer.rows[-1]['seconds'] = round(timer.rows[-1]['seconds'] / len(QUERIES), 6)
+
+    filters = {"min_rating": 0.0, "year_min": 1900, "only_unwatched": True}
+    rag.recommend_local(QUERIES[0], filters)
+    timer.run(
+        "recommend_local",
+        lambda: [rag.recommend_local(query, filters) for query in QUERIES],
+        repeat=args.repeat
+    )
+    timer.rows[-1]['seconds'] = round(timer.rows[-1]['seconds'] / len(QUERIES), 6)
+    timer.run(
+        "get_recommendations",
+        lambda: [rag.get_recommendations(query, filters) for query in QUERIES],
+        repeat=args.repeat
+    )
+    timer.rows[-1]['seconds'] = round(timer.rows[-1]['seconds'] / len(QUERIES), 6)
+
+    rag.release()
+    return timer.rows
+
+
+def compare(results, baseline_path: str):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(row['size'], row['stage']): row for row in json.load(f)['results']}
+    print(f"\n{'boyut':>7} {'aşama':<28}{'önce s':>11}{'şimdi s':>11}{'oran':>8}")
+    for row in results:
+        before = baseline.get((row['size'], row['stage']))
+        if before is None:
+            continue
+        ratio = row['seconds'] / before['seconds'] if before['seconds'] else float('inf')
+        print(f"{row['size']:>7} {row['stage']:<28}{before['seconds']:>11.5f}{row['seconds']:>11.5f}{ratio:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--review-ratio", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--embedder", choices=["hash", "model", "torch", "onnx", "onnx-int8"], default="hash")
+    parser.add_argument("--backend", choices=["numpy", "chroma"], default="numpy")
+    parser.add_argument("--representation", choices=["variants", "pooled", "multivector"], default="variants")
+    parser.add_argument("--no-trace-memory", dest="trace_memory", action="store_false")
+    parser.add_argument("--json", dest="json_path")
+    parser.add_argument("--compare", dest="baseline_path")
+    args = parser.parse_args()
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    work_dir = tempfile.mkdtemp(prefix="moviemind_bench_")
+    try:
+        results = []
+        for size in args.sizes:
+            results.extend(run_size(size, args, work_dir))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'boyut':>7} {'aşama':<28}{'saniye':>11}{'tepe MB':>10}")
+    for row in results:
+        print(f"{row['size']:>7} {row['stage']:<28}{row['seconds']:>11.5f}{row.get('peak_mb', float('nan')):>10.2f}")
+
+    if args.baseline_path:
+        compare(results, args.baseline_path)
+
+    if args.json_path:
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'config': {key: value for key, value in vars(args).items() if key not in ('json_path', 'baseline_path')},
+            },
+            'results': results,
+        }
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
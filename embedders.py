@@ -0,0 +1,103 @@
+import re
+import time
+import zlib
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+class HashingEmbedder:
+    """
+    Model indirmeden çalışan, deterministik feature-hashing embedder'ı.
+    Ortak kelime içeren metinler benzer vektörler alır; benchmark ve çevrimdışı
+    çalıştırmalar için SentenceTransformer yerine kullanılır.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for token in re.findall(r'\w+', text.casefold()):
+                bucket = zlib.crc32(token.encode('utf-8'))
+                vectors[i, bucket % self.dim] += 1.0 if bucket & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+        return vectors[0] if single else vectors
+
+
+def load_embedder(name: str):
+    """
+    "hash" için HashingEmbedder; "torch", "onnx" ya da "onnx-int8" için o backend'deki,
+    diğer durumlarda (ör. "model") varsayılan backend'deki paylaşılan SentenceTransformer modeli döner
+    """
+    if name == "hash":
+        return HashingEmbedder()
+    import resources
+    if name in resources.EMBEDDING_BACKENDS:
+        return resources.get_embedding_model(name)
+    return resources.get_embedding_model()
+
+
+def _normalized(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(queries: np.ndarray, documents: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ documents.T
+    k = min(k, documents.shape[0])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return top
+
+
+def compare_embedders(embedders: Dict[str, object], documents: Sequence[str], queries: Sequence[str],
+                      k: int = 10, reference: str = "torch", batch_size: int = 32) -> List[Dict]:
+    """
+    Her embedder için doküman encode hızını (metin/sn), tek sorgu gecikmesini ve
+    referans embedder'ın (fp32) ilk k sonucuna göre recall@k değerini ölçer.
+    Isınma (model yükleme) çağrısı ölçüme dahil edilmez.
+    """
+    documents, queries = list(documents), list(queries)
+    results = {}
+    for name, embedder in embedders.items():
+        embedder.encode(documents[:batch_size], batch_size=batch_size)
+
+        start = time.perf_counter()
+        doc_vectors = _normalized(embedder.encode(documents, batch_size=batch_size))
+        encode_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        query_vectors = _normalized(np.vstack([embedder.encode([query]) for query in queries]))
+        query_ms = (time.perf_counter() - start) / max(1, len(queries)) * 1000
+
+        results[name] = {
+            'backend': name,
+            'model': getattr(embedder, 'name', type(embedder).__name__),
+            'documents': len(documents),
+            'texts_per_second': round(len(documents) / encode_seconds, 1),
+            'query_ms': round(query_ms, 3),
+            'top_k': _top_k(query_vectors, doc_vectors, k),
+        }
+
+    truth = results[reference]['top_k'] if reference in results else None
+    rows = []
+    for row in results.values():
+        top_k = row.pop('top_k')
+        if truth is not None:
+            hits = [len(set(found) & set(expected)) / len(expected) for found, expected in zip(top_k, truth)]
+            row['recall_at_k'] = round(float(np.mean(hits)), 4)
+        row['k'] = min(k, len(documents))
+        rows.append(row)
+    return rows
@@ -0,0 +1,378 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Aynı cache klasörünü kullanan süreç sayısı bunu aşarsa cache yalnızca bellekte tutulur
+MAX_PROCESS_DIRS = 8
+
+
+def _try_lock(lock_file) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+class EmbeddingCache:
+    """
+    (model adı, metin hash'i) anahtarlı, diskte kalıcı embedding deposu.
+    Vektörler memory-mapped float32 bir matriste tutulur. Anahtar -> satır eşlemesi
+    index.json anlık görüntüsü ve yanındaki yalnızca-ekleme journal.log dosyasıdır:
+    her ıska journal'a birkaç satır ekler, index.json yalnızca flush()'ta (deferred_flush
+    sonu, süreç çıkışı ya da journal büyüdüğünde) yeniden yazılır. Kapasite dolduğunda
+    en uzun süredir kullanılmayan kayıtlar (LRU) silinir.
+
+    Bir klasörü aynı anda tek süreç kullanır (dosya kilidi); kilit başka bir süreçteyse
+    "proc-N" alt klasörlerinden boşta olanı alınır, hiçbiri boş değilse cache diske yazılmaz.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, max_entries: int = 200_000):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        base_dir = os.path.join(cache_dir, re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name))
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._defer_depth = 0
+        self._dirty = False
+        self._matrix = None
+        self._journal = None
+        self._journal_lines = 0
+        self._lock_file = None
+        self.cache_dir = self._acquire_directory(base_dir)
+        self.persistent = self.cache_dir is not None
+        if self.persistent:
+            self.index_path = os.path.join(self.cache_dir, "index.json")
+            self.vectors_path = os.path.join(self.cache_dir, "vectors.f32")
+            self.journal_path = os.path.join(self.cache_dir, "journal.log")
+        self._load()
+
+    def _acquire_directory(self, base_dir: str) -> Optional[str]:
+        """
+        Kilitlenebilen ilk klasörü döndürür; iki süreç aynı memmap satırını farklı anahtarlara veremez
+        """
+        for i in range(MAX_PROCESS_DIRS):
+            directory = base_dir if i == 0 else os.path.join(base_dir, f"proc-{i}")
+            os.makedirs(directory, exist_ok=True)
+            lock_file = open(os.path.join(directory, "lock"), "a+b")
+            if _try_lock(lock_file):
+                self._lock_file = lock_file
+                return directory
+            lock_file.close()
+        return None
+
+    def _reset_state(self):
+        self.dim = None
+        self.capacity = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # anahtar -> satır, en eski kullanılan başta
+        self._slot_keys: Dict[int, str] = {}
+        self._free_slots: List[int] = []
+        self._next_slot = 0
+
+    def _load(self):
+        self._reset_state()
+        if not self.persistent or not (os.path.exists(self.index_path) and os.path.exists(self.vectors_path)):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            self.dim = index['dim']
+            if 'entries' in index:
+                # Eski biçim: anahtar -> [satır, son kullanım]
+                ordered = sorted(index['entries'].items(), key=lambda item: item[1][1])
+                keys, slots = [key for key, _ in ordered], [slot for _, (slot, _) in ordered]
+            else:
+                keys, slots = index['keys'], index['slots']
+            self._entries = OrderedDict(zip(keys, slots))
+            self._slot_keys = dict(zip(slots, keys))
+            self._replay_journal()
+            self.capacity = os.path.getsize(self.vectors_path) // (self.dim * 4)
+            self._next_slot = max(self._slot_keys, default=-1) + 1
+            if self._next_slot > self.capacity:
+                raise ValueError("journal, vektör dosyasının dışındaki satırları gösteriyor")
+            used = np.zeros(self._next_slot, dtype=bool)
+            used[np.fromiter(self._slot_keys, dtype=np.int64, count=len(self._slot_keys))] = True
+            self._free_slots = np.flatnonzero(~used).tolist()
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r+', shape=(self.capacity, self.dim))
+        except Exception:
+            # Bozuk ya da uyumsuz cache dosyaları sessizce sıfırlanır
+            self.clear()
+
+    def _assign(self, key: str, slot: int):
+        previous = self._slot_keys.get(slot)
+        if previous is not None and previous != key:
+            del self._entries[previous]
+        old_slot = self._entries.pop(key, None)
+        if old_slot is not None and old_slot != slot:
+            self._slot_keys.pop(old_slot, None)
+        self._entries[key] = slot
+        self._slot_keys[slot] = key
+
+    def _replay_journal(self):
+        """
+        "anahtar satır" eklemeyi, "-anahtar" silmeyi gösterir; yarım yazılmış son satır yok sayılır
+        """
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                self._journal_lines += 1
+                if line.startswith("-"):
+                    slot = self._entries.pop(line[1:-1], None)
+                    if slot is not None:
+                        self._slot_keys.pop(slot, None)
+                else:
+                    key, slot = line.split()
+                    self._assign(key, int(slot))
+
+    def _write_journal(self, lines: List[str]):
+        if not self.persistent:
+            return
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal.write("".join(lines))
+        self._journal.flush()
+        self._journal_lines += len(lines)
+
+    def _save_index(self):
+        # Anahtarlar en eski kullanılandan yeniye sıralı; iki düz liste iç içe çiftlerden hızlı okunur
+        index = {
+            'model_name': self.model_name,
+            'dim': self.dim,
+            'keys': list(self._entries.keys()),
+            'slots': list(self._entries.values()),
+        }
+        # json.dumps tek seferde serileştirir; json.dump'ın parça parça yazmasından çok daha hızlıdır
+        payload = json.dumps(index, separators=(',', ':'))
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.index_path)
+        # Anlık görüntü journal'daki her şeyi içerir
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._journal_lines = 0
+
+    def flush(self):
+        with self._lock:
+            if not self.persistent:
+                return
+            if self._matrix is not None:
+                self._matrix.flush()
+            if self.dim is not None and (self._dirty or self._journal_lines):
+                self._save_index()
+            self._dirty = False
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    @contextmanager
+    def deferred_flush(self):
+        """
+        Blok içindeki encode çağrılarında index.json her batch'te değil, blok sonunda bir kez yazılır
+        """
+        with self._lock:
+            self._defer_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._defer_depth -= 1
+                if self._defer_depth == 0 and self._dirty:
+                    self.flush()
+
+    def _grow(self, needed_slots: int):
+        new_capacity = max(1024, self.capacity)
+        while new_capacity < needed_slots:
+            new_capacity *= 2
+        new_capacity = min(new_capacity, max(self.max_entries, needed_slots))
+        if new_capacity <= self.capacity:
+            return
+        if not self.persistent:
+            matrix = np.zeros((new_capacity, self.dim), dtype=np.float32)
+            if self._matrix is not None:
+                matrix[:self.capacity] = self._matrix
+            self._matrix = matrix
+            self.capacity = new_capacity
+            return
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self.capacity = new_capacity
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r+', shape=(self.capacity, self.dim))
+
+    def _evict(self, count: int) -> List[str]:
+        evicted = []
+        for _ in range(max(0, count)):
+            key, slot = self._entries.popitem(last=False)
+            del self._slot_keys[slot]
+            self._free_slots.append(slot)
+            evicted.append(key)
+        return evicted
+
+    def _allocate_slot(self) -> int:
+        if self._free_slots:
+            return self._free_slots.pop()
+        if self._next_slot >= self.capacity:
+            self._grow(self._next_slot + 1)
+        slot = self._next_slot
+        self._next_slot += 1
+        return slot
+
+    @staticmethod
+    def text_key(text: str) -> str:
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Metinlerin embedding'lerini döndürür; cache'te olmayanlar encode_fn ile
+        hesaplanıp depoya eklenir. Model kilit dışında çalışır, böylece bir oturum
+        büyük bir batch encode ederken diğerlerinin cache'teki sorguları beklemez.
+        """
+        keys = [self.text_key(text) for text in texts]
+        with self._lock:
+            missing = {}
+            cached = {}
+            for i, key in enumerate(keys):
+                if key in missing or key in cached:
+                    continue
+                slot = self._entries.get(key)
+                if slot is None:
+                    missing[key] = i
+                else:
+                    # Satır kilit bırakılınca başka bir anahtara verilebilir; vektör şimdiden kopyalanır
+                    self._entries.move_to_end(key)
+                    cached[key] = np.array(self._matrix[slot])
+            hit_count = len(keys) - sum(1 for key in keys if key in missing)
+            self.hits += hit_count
+            self.misses += len(keys) - hit_count
+            dim = self.dim
+
+        new_vectors = {}
+        if missing:
+            encoded = np.asarray(encode_fn([texts[i] for i in missing.values()]), dtype=np.float32)
+            if cached and encoded.shape[1] != dim:
+                # Cache başka boyutta vektörler tutuyor: bulunanlar da yeniden hesaplanır
+                missing.update((key, keys.index(key)) for key in cached)
+                cached = {}
+                encoded = np.asarray(encode_fn([texts[i] for i in missing.values()]), dtype=np.float32)
+            new_vectors = dict(zip(missing.keys(), encoded))
+            dim = encoded.shape[1]
+            with self._lock:
+                self._store(new_vectors)
+
+        if dim is None:
+            return np.empty((0, 0), dtype=np.float32)
+
+        result = np.empty((len(keys), dim), dtype=np.float32)
+        for i, key in enumerate(keys):
+            result[i] = new_vectors[key] if key in new_vectors else cached[key]
+        return result
+
+    def _store(self, new_vectors: Dict[str, np.ndarray]):
+        """
+        Yeni vektörleri depoya ve journal'a yazar; kilit altında çağrılır
+        """
+        dim = len(next(iter(new_vectors.values())))
+        if self.dim != dim:
+            self.clear()
+            self.dim = dim
+            self._dirty = True
+        if self.persistent and not os.path.exists(self.index_path):
+            # Journal her zaman boyutu bilinen bir anlık görüntünün üstüne yazılır
+            self._save_index()
+        # Encode sürerken başka bir çağrının eklediği anahtarlar tekrar yazılmaz
+        to_store = [(key, vector) for key, vector in new_vectors.items() if key not in self._entries]
+        to_store = to_store[-self.max_entries:]
+        if not to_store:
+            return
+        evicted = self._evict(len(self._entries) + len(to_store) - self.max_entries)
+        if evicted:
+            # Satırların üzerine yazılmadan önce diskte atıldıkları kaydedilir
+            self._write_journal([f"-{key}\n" for key in evicted])
+        added = []
+        for key, vector in to_store:
+            slot = self._allocate_slot()
+            self._matrix[slot] = vector
+            self._entries[key] = slot
+            self._slot_keys[slot] = key
+            added.append(f"{key} {slot}\n")
+        self._write_journal(added)
+        self._dirty = True
+        # Journal sınırsız büyümesin: boyutu kayıt sayısını geçince anlık görüntü alınır
+        if not self._defer_depth and self._journal_lines > max(4096, len(self._entries)):
+            self.flush()
+
+    def contains(self, text: str) -> bool:
+        return self.text_key(text) in self._entries
+
+    def discard(self, texts: List[str]):
+        """
+        Metinlerin kayıtlarını siler (örn. başka bir modelle hesaplandıkları anlaşılınca)
+        """
+        with self._lock:
+            removed = []
+            for key in {self.text_key(text) for text in texts}:
+                slot = self._entries.pop(key, None)
+                if slot is not None:
+                    del self._slot_keys[slot]
+                    self._free_slots.append(slot)
+                    removed.append(f"-{key}\n")
+            if removed:
+                self._write_journal(removed)
+                self._dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._matrix = None
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self.persistent:
+                for path in (self.index_path, self.vectors_path, self.journal_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+            self._journal_lines = 0
+            self._reset_state()
+            self._dirty = False
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            'model_name': self.model_name,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'persistent': self.persistent,
+        }
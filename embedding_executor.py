@@ -0,0 +1,129 @@
+import os
+import math
+import inspect
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import List, Optional
+
+import numpy as np
+
+_worker_model = None
+
+
+def _init_worker(model):
+    global _worker_model
+    _worker_model = model
+
+
+def _encode_shard(texts: List[str], batch_size: int) -> np.ndarray:
+    return np.asarray(_worker_model.encode(texts, batch_size=batch_size), dtype=np.float32)
+
+
+def _encode_accepts_pool(sentence_model) -> bool:
+    """
+    Yeni sentence-transformers sürümlerinde havuz doğrudan encode(pool=...) ile kullanılır;
+    encode_multi_process her çağrıda kullanımdan kalktı uyarısı verir
+    """
+    try:
+        return 'pool' in inspect.signature(sentence_model.encode).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def parse_workers(value: Optional[str]) -> int:
+    """
+    "auto" için çekirdek sayısını, diğer durumlarda verilen sayıyı (en az 1) döndürür
+    """
+    if not value:
+        return 1
+    if value == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
+
+class EmbeddingExecutor:
+    """
+    Büyük encode işlerini CPU çekirdeklerine dağıtır.
+    SentenceTransformer modellerinde kütüphanenin çok süreçli havuzu, diğer (pickle'lanabilen)
+    modellerde spawn tabanlı ProcessPoolExecutor kullanılır. Tek çekirdekte ya da
+    min_parallel_texts'ten küçük girdilerde havuz atlanır ve doğrudan encode edilir.
+    Havuz ilk paralel çağrıda açılır ve süreç boyunca yeniden kullanılır.
+    """
+
+    def __init__(self, model, workers: int = 1, min_parallel_texts: int = 2048, token_budget: int = 8192):
+        self.model = model
+        self.workers = workers
+        self.min_parallel_texts = min_parallel_texts
+        self.token_budget = token_budget
+        self._pool = None
+        self._pool_kind = None
+        self._lock = threading.Lock()
+
+    @property
+    def parallel(self) -> bool:
+        return self.workers > 1 and self._pool_kind != "unavailable"
+
+    def auto_batch_size(self, texts: List[str]) -> int:
+        """
+        Bir batch'teki toplam token sayısını (~4 karakter/token) token_budget civarında tutan,
+        8 ile 256 arasında ikinin kuvveti bir batch boyutu seçer
+        """
+        sample = texts[:1000]
+        avg_tokens = max(1.0, sum(len(text) for text in sample) / max(1, len(sample)) / 4)
+        return int(min(256, max(8, 2 ** int(math.log2(max(1.0, self.token_budget / avg_tokens))))))
+
+    def _start_pool(self):
+        sentence_model = self.model.get_model() if hasattr(self.model, 'get_model') else self.model
+        if hasattr(sentence_model, 'start_multi_process_pool'):
+            self._pool = sentence_model.start_multi_process_pool(target_devices=['cpu'] * self.workers)
+            self._pool_kind = "sentence-transformers"
+            return
+        try:
+            pickle.dumps(self.model)
+        except Exception:
+            # Alt süreçlere taşınamayan modeller tek süreçte encode edilir
+            self._pool_kind = "unavailable"
+            return
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model,)
+        )
+        self._pool_kind = "process"
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        batch_size = kwargs.pop('batch_size', None) or self.auto_batch_size(texts)
+        if len(texts) < self.min_parallel_texts or not self.parallel:
+            return self.model.encode(texts, batch_size=batch_size, **kwargs)
+
+        with self._lock:
+            if self._pool_kind is None:
+                self._start_pool()
+            if self._pool_kind == "unavailable":
+                return self.model.encode(texts, batch_size=batch_size, **kwargs)
+
+            # Her sürece birkaç parça düşsün ki yavaş kalan süreç tüm işi bekletmesin
+            chunk_size = math.ceil(len(texts) / (self.workers * 4))
+            if self._pool_kind == "sentence-transformers":
+                sentence_model = self.model.get_model() if hasattr(self.model, 'get_model') else self.model
+                if _encode_accepts_pool(sentence_model):
+                    return sentence_model.encode(texts, pool=self._pool, batch_size=batch_size, chunk_size=chunk_size)
+                # sentence-transformers 5 öncesi: havuz yalnızca encode_multi_process ile kullanılabilir
+                return sentence_model.encode_multi_process(
+                    texts, self._pool, batch_size=batch_size, chunk_size=chunk_size
+                )
+            shards = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+            return np.vstack(list(self._pool.map(_encode_shard, shards, [batch_size] * len(shards))))
+
+    def close(self):
+        with self._lock:
+            if self._pool_kind == "sentence-transformers":
+                sentence_model = self.model.get_model() if hasattr(self.model, 'get_model') else self.model
+                sentence_model.stop_multi_process_pool(self._pool)
+            elif self._pool_kind == "process":
+                self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+            self._pool_kind = None
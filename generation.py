@@ -0,0 +1,225 @@
+import re
+import json
+import time
+import queue
+import difflib
+import hashlib
+import threading
+import unicodedata
+from typing import Callable, Dict, List, Optional
+
+
+class GenerationCancelled(Exception):
+    pass
+
+
+class GenerationTimeout(Exception):
+    pass
+
+
+def _chunk_text(chunk) -> str:
+    # Gemini, güvenlik filtresine takılan parçalarda .text erişiminde ValueError fırlatır
+    try:
+        return chunk.text or ''
+    except ValueError:
+        return ''
+
+
+def stream_generate(model, prompt: str, on_token: Optional[Callable[[str], None]] = None,
+                    timeout: Optional[float] = None, cancel_event: Optional[threading.Event] = None) -> str:
+    """
+    Modelden yanıtı akış (stream) olarak alır ve gelen her parçayı on_token'a iletir.
+    Akış ayrı bir thread'de tüketilir; böylece takılan bir bağlantı da timeout'a tabi olur
+    ve cancel_event set edildiğinde bir sonraki parçada durulur.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    chunks = queue.Queue()
+    done = object()
+
+    def produce():
+        try:
+            kwargs = {'stream': True}
+            if timeout:
+                kwargs['request_options'] = {'timeout': timeout}
+            for chunk in model.generate_content(prompt, **kwargs):
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                chunks.put(_chunk_text(chunk))
+            chunks.put(done)
+        except Exception as e:
+            chunks.put(e)
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    parts = []
+    while True:
+        if cancel_event is not None and cancel_event.is_set():
+            raise GenerationCancelled()
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            raise GenerationTimeout()
+        try:
+            # İptal isteğini kaçırmamak için kısa aralıklarla bekle
+            item = chunks.get(timeout=0.1 if remaining is None else min(0.1, remaining))
+        except queue.Empty:
+            continue
+        if item is done:
+            return ''.join(parts)
+        if isinstance(item, Exception):
+            raise item
+        parts.append(item)
+        if on_token and item:
+            on_token(item)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Yakın-özdeş sorguların aynı cache anahtarına düşmesi için küçük harf, noktalama ve boşluk normalizasyonu
+    """
+    query = re.sub(r'[^\w\s]', ' ', query.casefold())
+    return ' '.join(query.split())
+
+
+def response_cache_key(query: str, top_movies: List[Dict], exclusions: List[str], model_name: str) -> str:
+    exclusion_hash = hashlib.sha1('\n'.join(sorted(exclusions)).encode('utf-8')).hexdigest()
+    payload = json.dumps({
+        'query': normalize_query(query),
+        'top_movies': [(movie['title'], movie['year'], movie.get('rating')) for movie in top_movies],
+        'exclusions': exclusion_hash,
+        'model': model_name,
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class _StubChunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGenerativeModel:
+    """
+    Ağ erişimi olmadan test ve benchmark için Gemini yerine geçen yerel model.
+    Prompt'ta adı geçmeyen filmlerden (yeniden sıralamada aday listesinden) istenen sayıda,
+    Gemini ile aynı formatta öneri üretir.
+    """
+
+    CANDIDATES = [
+        ("Arrival", 2016), ("Blade Runner 2049", 2017), ("Gravity", 2013), ("The Martian", 2015),
+        ("Memento", 2000), ("Se7en", 1995), ("Gone Girl", 2014), ("Zodiac", 2007),
+        ("Mad Max: Fury Road", 2015), ("Heat", 1995), ("Sicario", 2015), ("Drive", 2011),
+        ("The Others", 2001), ("Hereditary", 2018), ("Get Out", 2017), ("The Conjuring", 2013),
+        ("Amélie", 2001), ("Her", 2013), ("La La Land", 2016), ("Whiplash", 2014),
+        ("Interstellar", 2014), ("Inception", 2010), ("The Prestige", 2006), ("Shutter Island", 2010),
+    ]
+
+    def __init__(self, model_name: str = "stub", delay: float = 0.0, chunk_words: int = 4):
+        self.model_name = model_name
+        self.delay = delay
+        self.chunk_words = chunk_words
+        self.calls = 0
+
+    def _respond(self, prompt: str) -> str:
+        counts = re.findall(r'(\d+) adet', prompt)
+        count = int(counts[-1]) if counts else 5
+        match = re.search(r'(\d+)-(\d+) adet', prompt)
+        if match:
+            count = int(match.group(2))
+        # Yeniden sıralama prompt'larında yalnızca numaralı aday listesinden seçilir
+        listed = [(name, int(year)) for name, year in re.findall(r'^\s*\d+\. (.+?) \((\d{4})\)\s*$', prompt, re.M)]
+        pool = listed or self.CANDIDATES
+        start = int(hashlib.sha1(prompt.encode('utf-8')).hexdigest(), 16) % len(pool)
+        rotated = pool[start:] + pool[:start]
+        picks = (rotated if listed else [(name, year) for name, year in rotated if f"{name} ({year})" not in prompt])[:count]
+
+        lines = ["**Beğendiğiniz filmlerden yola çıkarak:**", "İzlediğiniz filmlere benzer birkaç öneri:", "", "**Önerilerim:**"]
+        lines += [f"- {name} ({year}): Yerel test modelinin önerisi." for name, year in picks]
+        return '\n'.join(lines)
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        self.calls += 1
+        text = self._respond(prompt)
+        if not stream:
+            time.sleep(self.delay)
+            return _StubResponse(text)
+
+        def chunks():
+            words = text.split(' ')
+            for i in range(0, len(words), self.chunk_words):
+                time.sleep(self.delay / max(1, len(words) // self.chunk_words))
+                piece = ' '.join(words[i:i + self.chunk_words])
+                yield _StubChunk(piece if i + self.chunk_words >= len(words) else piece + ' ')
+        return chunks()
+
+
+def normalize_title(title: str) -> str:
+    """
+    Başlığı aksan, büyük/küçük harf, noktalama ve boşluk farklarından arındırır
+    """
+    title = unicodedata.normalize('NFKD', str(title))
+    title = ''.join(ch for ch in title if not unicodedata.combining(ch)).casefold()
+    title = re.sub(r'[^\w\s]', ' ', title.replace('&', ' and '))
+    return ' '.join(title.split())
+
+
+RECOMMENDATION_LINE = re.compile(r'^\s*[-*•]\s*(?:\*\*)?\s*(?P<title>.+?)\s*\((?P<year>\d{4})\)')
+
+
+def parse_recommendations(text: str) -> List[Dict]:
+    """
+    "- [Film Adı] ([Yıl]): açıklama" biçimindeki satırları ayrıştırır
+    """
+    parsed = []
+    for line in text.splitlines():
+        match = RECOMMENDATION_LINE.match(line)
+        if match:
+            title = match.group('title').strip().strip('*').strip()
+            parsed.append({'line': line.strip(), 'title': title, 'year': int(match.group('year'))})
+    return parsed
+
+
+class TitleIndex:
+    """
+    İzlenen filmler için normalize edilmiş başlık indeksi; tam eşleşme O(1),
+    bulanık eşleşme yalnızca aynı/komşu yıldaki başlıklar arasında yapılır.
+    """
+
+    def __init__(self, films, fuzzy_threshold: float = 0.9):
+        self.fuzzy_threshold = fuzzy_threshold
+        self._years_by_title: Dict[str, set] = {}
+        self._titles_by_year: Dict[int, List[str]] = {}
+        for title, year in films:
+            normalized = normalize_title(title)
+            self._years_by_title.setdefault(normalized, set()).add(year)
+            self._titles_by_year.setdefault(year, []).append(normalized)
+
+    def __len__(self):
+        return len(self._years_by_title)
+
+    def contains(self, title: str, year: Optional[int] = None) -> bool:
+        normalized = normalize_title(title)
+        years = self._years_by_title.get(normalized)
+        if years is not None and (year is None or -1 in years or any(abs(year - y) <= 1 for y in years)):
+            return True
+        if year is None:
+            return False
+        # seq2 önbelleğe alınır; ucuz üst sınırlar (real_quick_ratio/quick_ratio) adayları erken eler
+        matcher = difflib.SequenceMatcher(None, autojunk=False)
+        matcher.set_seq2(normalized)
+        for candidate_year in (year - 1, year, year + 1):
+            for candidate in self._titles_by_year.get(candidate_year, []):
+                matcher.set_seq1(candidate)
+                if (matcher.real_quick_ratio() >= self.fuzzy_threshold
+                        and matcher.quick_ratio() >= self.fuzzy_threshold
+                        and matcher.ratio() >= self.fuzzy_threshold):
+                    return True
+        return False
+
+
+def estimate_tokens(text: str) -> int:
+    # Gemini için kaba tahmin: ~4 karakter / token
+    return max(1, len(text) // 4)
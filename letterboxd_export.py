@@ -0,0 +1,179 @@
+import io
+import os
+import zipfile
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+
+def table_name(path: str) -> str:
+    """
+    "Ratings.csv", "likes/films.csv" gibi yolları "ratings", "likes/films" biçimine getirir
+    """
+    name = path.replace('\\', '/').strip('/').lower()
+    return name[:-4] if name.endswith('.csv') else name
+
+
+class LetterboxdExport:
+    """
+    Letterboxd exportunu bellekten ya da yerinden okur; hiçbir şey diske yazılmaz.
+    Kaynak bir klasör, bir ZIP (yol, bytes ya da dosya benzeri nesne) veya
+    {'ratings.csv': bytes/dosya benzeri, ...} sözlüğü olabilir. Tablolar "ratings",
+    "reviews", "diary", "watched", "watchlist", "likes/films" gibi adlarla açılır.
+    """
+
+    def __init__(self, openers: Dict[str, Callable], label: str = ''):
+        self._openers = openers
+        self.label = label
+
+    @classmethod
+    def open(cls, source) -> "LetterboxdExport":
+        if isinstance(source, LetterboxdExport):
+            return source
+        if isinstance(source, dict):
+            return cls({table_name(name): cls._buffer_opener(data) for name, data in source.items() if data is not None}, label='upload')
+        if isinstance(source, (str, os.PathLike)):
+            path = os.fspath(source)
+            if os.path.isdir(path):
+                return cls._from_folder(path)
+            if zipfile.is_zipfile(path):
+                # Arşiv yalnızca üye listesi için açılıp kapatılır; tablolar okunurken yeniden açılır
+                with zipfile.ZipFile(path) as archive:
+                    return cls._from_zip(archive, label=path, open_member=lambda member: cls._open_zip_member(path, member))
+            raise FileNotFoundError(f"Letterboxd exportu bulunamadı: {path}")
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return cls._from_zip(zipfile.ZipFile(io.BytesIO(bytes(source))), label='zip')
+        if hasattr(source, 'read'):
+            source.seek(0)
+            return cls._from_zip(zipfile.ZipFile(source), label=getattr(source, 'name', 'zip'))
+        raise TypeError(f"Desteklenmeyen export kaynağı: {type(source).__name__}")
+
+    @staticmethod
+    def _buffer_opener(data) -> Callable:
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            return lambda: io.BytesIO(bytes(data))
+
+        def rewind():
+            data.seek(0)
+            return data
+        return rewind
+
+    @classmethod
+    def _from_folder(cls, folder: str) -> "LetterboxdExport":
+        openers = {}
+        for root, _, files in os.walk(folder):
+            for file_name in files:
+                if file_name.lower().endswith('.csv'):
+                    path = os.path.join(root, file_name)
+                    openers[table_name(os.path.relpath(path, folder))] = (lambda p=path: p)
+        return cls(openers, label=folder)
+
+    @staticmethod
+    def _open_zip_member(path: str, member: str):
+        """
+        Üyeyi açar; ZipFile hemen kapatılır, dosya tanıtıcısı dönen akış kapanınca bırakılır
+        """
+        with zipfile.ZipFile(path) as archive:
+            return archive.open(member)
+
+    @classmethod
+    def _from_zip(cls, archive: zipfile.ZipFile, label: str, open_member: Optional[Callable] = None) -> "LetterboxdExport":
+        members = [info.filename for info in archive.infolist() if not info.is_dir() and info.filename.lower().endswith('.csv')]
+        # ZIP bir üst klasörle paketlendiyse (klasor/ratings.csv) kök, ratings.csv'nin bulunduğu klasördür
+        roots = [member[:-len('ratings.csv')] for member in members if table_name(member).split('/')[-1] == 'ratings']
+        prefix = min(roots, key=len) if roots else ''
+        open_member = open_member or archive.open
+        openers = {
+            table_name(member[len(prefix):]): (lambda m=member: open_member(m))
+            for member in members if member.startswith(prefix)
+        }
+        return cls(openers, label=label)
+
+    def has(self, name: str) -> bool:
+        return table_name(name) in self._openers
+
+    def tables(self) -> List[str]:
+        return sorted(self._openers)
+
+    def open_table(self, name: str):
+        """
+        Tablonun pandas'a verilecek kaynağını döndürür: klasörde dosya yolu, bellekte baştan okunacak ikili akış
+        """
+        opener = self._openers.get(table_name(name))
+        if opener is None:
+            raise FileNotFoundError(f"Export içinde {table_name(name)}.csv bulunamadı ({self.label})")
+        return opener()
+
+    def read_csv(self, name: str, **kwargs):
+        """
+        Tabloyu DataFrame olarak okur; chunksize verilirse parça parça okuyan iterator döner
+        """
+        return pd.read_csv(self.open_table(name), **kwargs)
+
+    def count_rows(self, name: str) -> int:
+        """
+        Başlık hariç satır sayısı (ilerleme göstergesi için)
+        """
+        source = self.open_table(name)
+        stream = open(source, 'rb') if isinstance(source, str) else source
+        try:
+            lines, last = 0, b'\n'
+            for block in iter(lambda: stream.read(1 << 20), b''):
+                lines += block.count(b'\n')
+                last = block[-1:]
+        finally:
+            if stream is not source:
+                stream.close()
+        if last != b'\n':
+            lines += 1
+        return max(0, lines - 1)
+
+
+# Puan ve yorum dışında okunup MovieMindRAG.export_tables'a konan tablolar
+EXTRA_TABLES = ('diary', 'watched', 'watchlist', 'likes/films', 'profile')
+
+REVIEW_COLUMNS = {'Date', 'Name', 'Year', 'Letterboxd URI', 'Review'}
+
+
+def _title_keys(frame: pd.DataFrame) -> List[tuple]:
+    """
+    (ad, yıl) anahtarları; yıl tipleri (int/float/boş) eşitlenir, boş yıl -1 olur
+    """
+    years = pd.to_numeric(frame['Year'], errors='coerce').fillna(-1).astype('int64').tolist()
+    return list(zip(frame['Name'].tolist(), years))
+
+
+class ReviewIndex:
+    """
+    Yorumları Letterboxd URI'sine ve (ad, yıl) çiftine göre indeksler; bir filmin birden fazla
+    yorumu varsa en son yazılanı kullanılır. Yorum URI'leri çoğunlukla filme değil günlük kaydına
+    işaret ettiğinden URI ile eşleşmeyen puanlar (ad, yıl) ile eşleştirilir.
+    """
+
+    def __init__(self, reviews_df: pd.DataFrame):
+        reviews_df = reviews_df[reviews_df['Review'].notna()]
+        if 'Date' in reviews_df.columns and not reviews_df['Date'].is_monotonic_increasing:
+            reviews_df = reviews_df.sort_values('Date', kind='stable')
+        self.dtype = reviews_df['Review'].dtype
+        texts = reviews_df['Review'].tolist()
+        # Tarih sırasıyla doldurulan sözlüklerde aynı anahtarın son yazılan yorumu kalır
+        self.by_uri = {}
+        if 'Letterboxd URI' in reviews_df.columns:
+            self.by_uri = {uri: text for uri, text in zip(reviews_df['Letterboxd URI'].tolist(), texts) if pd.notna(uri)}
+        self.by_title = dict(zip(_title_keys(reviews_df), texts))
+
+    def attach(self, ratings_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Puan parçasına Review kolonunu ekler (eşleşmeyen satırlarda NaN)
+        """
+        if self.by_uri and 'Letterboxd URI' in ratings_df.columns:
+            reviews = [self.by_uri.get(uri) for uri in ratings_df['Letterboxd URI'].tolist()]
+        else:
+            reviews = [None] * len(ratings_df)
+        if self.by_title and None in reviews:
+            reviews = [
+                text if text is not None else self.by_title.get(key)
+                for text, key in zip(reviews, _title_keys(ratings_df))
+            ]
+        ratings_df['Review'] = pd.Series(reviews, index=ratings_df.index, dtype=object).astype(self.dtype)
+        return ratings_df
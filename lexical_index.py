@@ -0,0 +1,156 @@
+import math
+import re
+from typing import Dict, Iterable, List, Optional
+
+from generation import normalize_title
+
+# Sorguda başlık dışında kalabilecek dolgu kelimeleri (normalize edilmiş: aksansız, küçük harf)
+QUERY_FILLERS = {
+    'gibi', 'benzer', 'benzeri', 'film', 'filmi', 'filmler', 'filmleri', 'filme', 'bir', 'bana',
+    'oner', 'oneri', 'onerisi', 'tavsiye', 'et', 'turunde', 'tarzi', 'tarzinda', 'like', 'movie',
+    'movies', 'similar', 'to',
+}
+
+YEAR_TOKEN = re.compile(r'^(18|19|20)\d{2}$')
+
+
+def tokenize(text: str) -> List[str]:
+    return normalize_title(text).split()
+
+
+def matches_filters(metadata: Dict, filters: Optional[Dict] = None) -> bool:
+    """
+    MovieMindRAG.build_where_clause ile aynı watched / min_rating / year_min kuralları
+    """
+    filters = filters or {}
+    if filters.get('watched') is not None and bool(metadata.get('watched')) != bool(filters['watched']):
+        return False
+    if filters.get('min_rating') is not None and metadata.get('rating', -1.0) < float(filters['min_rating']):
+        return False
+    if filters.get('year_min') is not None and metadata.get('year', -1) < int(filters['year_min']):
+        return False
+    return True
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List], k: int = 60) -> List:
+    """
+    Sıralı listeleri 1 / (k + sıra) puanlarının toplamıyla birleştirir (RRF)
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda key: scores[key], reverse=True)
+
+
+class BM25Index:
+    """
+    Film başına tek kayıt tutan ters indeks (BM25). Yalnızca başlık, yıl ve (varsa) yorum
+    indekslenir; başlık terimleri title_boost kez sayılır. Doküman şablonlarındaki "Film",
+    "Puan", "Yorum" gibi her kayıtta geçen kelimeler indekse girmez.
+    Her kayıt, vektör indeksindeki satır id'lerini ve arama sonucu metadatasını taşır.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, title_boost: int = 2):
+        self.k1 = k1
+        self.b = b
+        self.title_boost = title_boost
+        self.postings: Dict[str, Dict[int, int]] = {}  # terim -> {kayıt: terim frekansı}
+        self.lengths: List[int] = []
+        self.films: List[Dict] = []
+        self._film_ids: Dict[tuple, int] = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self.films)
+
+    def add(self, title: str, year: int, review: str, metadata: Dict, row_id: str):
+        """
+        Filmi ilk görüldüğünde indeksler; aynı filmin sonraki satırlarından yalnızca id'yi ekler
+        """
+        key = (title, year)
+        film_id = self._film_ids.get(key)
+        if film_id is not None:
+            self.films[film_id]['row_ids'].append(row_id)
+            return
+
+        title_terms = tokenize(title)
+        terms = title_terms * self.title_boost + tokenize(review or '')
+        if year != -1:
+            terms.append(str(year))
+        film_id = self._film_ids[key] = len(self.films)
+        self.films.append({
+            'title_terms': set(title_terms),
+            'metadata': {
+                'title': metadata['title'],
+                'year': metadata['year'],
+                'rating': metadata['rating'],
+                'watched': metadata['watched']
+            },
+            'row_ids': [row_id],
+        })
+        counts = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            self.postings.setdefault(term, {})[film_id] = count
+        self.lengths.append(len(terms))
+        self._total_length += len(terms)
+
+    def search(self, query: str, k: int = 10, filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Filtreleri sağlayan filmleri BM25 skoruna göre sıralar; her sonuç {'film', 'score'} içerir.
+        Dolgu kelimeleri ve (birden fazla film varken) her filmde geçen terimler ayırt edici
+        olmadığından skora katılmaz; aksi halde "korku film" gibi sorgularda en kısa kayıtlar öne çıkar.
+        """
+        if not self.films:
+            return []
+        n = len(self.films)
+        avg_length = self._total_length / n
+        scores = {}
+        for term in set(tokenize(query)) - QUERY_FILLERS:
+            postings = self.postings.get(term)
+            if not postings or (n > 1 and len(postings) == n):
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for film_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[film_id] / avg_length)
+                scores[film_id] = scores.get(film_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        results = []
+        for film_id, score in ranked:
+            film = self.films[film_id]
+            if matches_filters(film['metadata'], filters):
+                results.append({'film': film, 'score': score})
+                if len(results) >= k:
+                    break
+        return results
+
+    def title_matches(self, query: str) -> List[Dict]:
+        """
+        Sorgu (dolgu kelimeleri ve yıl dışında) tam olarak bir film başlığından oluşuyorsa o filmleri
+        döndürür; örn. "Interstellar gibi" ya da "It 2017". Böyle sorgularda sözcüksel eşleşme
+        güvenilirdir ve anlamsal genişletmeye gerek kalmaz.
+        """
+        query_terms = tokenize(query)
+        years = {int(term) for term in query_terms if YEAR_TOKEN.match(term)}
+        meaningful = {term for term in query_terms if term not in QUERY_FILLERS and not YEAR_TOKEN.match(term)}
+        if not meaningful:
+            return []
+
+        # Anlamlı terimlerin hepsini içeren filmler adaydır; başlık da sorgunun içinde olmalı
+        candidates = None
+        for term in meaningful:
+            film_ids = set(self.postings.get(term, {}))
+            candidates = film_ids if candidates is None else candidates & film_ids
+            if not candidates:
+                return []
+        query_set = set(query_terms)
+        matches = [
+            self.films[film_id] for film_id in sorted(candidates)
+            if self.films[film_id]['title_terms'] and meaningful <= self.films[film_id]['title_terms'] <= query_set
+        ]
+        if years:
+            matches = [film for film in matches if film['metadata']['year'] in years]
+        return matches
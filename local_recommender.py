@@ -0,0 +1,106 @@
+import os
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def build_taste_vector(vectors: np.ndarray, ratings: List[float]) -> Optional[np.ndarray]:
+    """
+    İzlenen filmlerin vektörlerini puana göre ağırlıklandırıp tek bir zevk vektörüne indirger.
+    Ağırlık 2^(puan - ortalama puan): ortalamanın bir yıldız üstü iki kat, altı yarım sayılır;
+    puansız filmler (-1) ortalama puanlı kabul edilir.
+    """
+    if len(vectors) == 0:
+        return None
+    ratings = np.asarray(ratings, dtype=np.float64)
+    rated = ratings >= 0
+    mean_rating = ratings[rated].mean() if rated.any() else 0.0
+    ratings = np.where(rated, ratings, mean_rating)
+    weights = np.power(2.0, ratings - mean_rating)
+    taste = (normalize_rows(vectors) * weights[:, None]).sum(axis=0)
+    return normalize_rows(taste)[0]
+
+
+class CandidateCatalog:
+    """
+    Önerilebilecek (izlenmemiş) filmlerin embed edilmiş kataloğu; en yakın komşu araması
+    tek matris-vektör çarpımıyla yapılır
+    """
+
+    def __init__(self, films: List[Dict], vectors: np.ndarray):
+        self.films = films
+        self.vectors = normalize_rows(vectors) if len(films) else np.empty((0, 0), dtype=np.float32)
+        self.years = np.array([film['year'] for film in films], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.films)
+
+    @staticmethod
+    def candidate_text(name: str, year: int, review: str = '') -> str:
+        # İndeksteki dokümanlarla aynı şablon (puansız)
+        text = f"Film: {name} ({year if year != -1 else 'Yıl yok'})"
+        if review:
+            text += f" | Yorum: {review}"
+        return text
+
+    @classmethod
+    def from_csv(cls, path: str, encode: Callable[[List[str]], np.ndarray]) -> "CandidateCatalog":
+        """
+        Name/Title, Year (ve varsa Review) kolonlu CSV'den kataloğu kurar
+        """
+        df = pd.read_csv(path, on_bad_lines='skip')
+        title_column = 'Name' if 'Name' in df.columns else 'Title'
+        films = []
+        seen = set()
+        for name, year, review in zip(
+            df[title_column],
+            df['Year'] if 'Year' in df.columns else [None] * len(df),
+            df['Review'] if 'Review' in df.columns else [None] * len(df),
+        ):
+            if pd.isna(name) or not str(name).strip():
+                continue
+            year = int(year) if pd.notna(year) else -1
+            key = (str(name).strip(), year)
+            if key in seen:
+                continue
+            seen.add(key)
+            review = str(review).strip() if pd.notna(review) else ''
+            films.append({'title': key[0], 'year': year, 'text': cls.candidate_text(key[0], year, review)})
+        vectors = encode([film['text'] for film in films]) if films else np.empty((0, 0), dtype=np.float32)
+        return cls(films, vectors)
+
+    def search(self, query_vector: np.ndarray, k: int, exclude: Optional[Callable[[str, int], bool]] = None,
+               year_min: Optional[int] = None) -> List[Dict]:
+        """
+        Sorgu vektörüne en yakın, dışlanmayan ve year_min'den yeni k filmi (film, skor, satır) döndürür
+        """
+        if not self.films:
+            return []
+        scores = self.vectors @ normalize_rows(query_vector)[0]
+        if year_min is not None:
+            scores = np.where(self.years >= int(year_min), scores, -np.inf)
+        order = np.argsort(-scores, kind='stable')
+        results = []
+        for row in order:
+            if not np.isfinite(scores[row]):
+                break
+            film = self.films[row]
+            if exclude and exclude(film['title'], film['year']):
+                continue
+            results.append({'film': film, 'score': float(scores[row]), 'row': int(row)})
+            if len(results) >= k:
+                break
+        return results
+
+
+def catalog_path() -> str:
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)), "letterboxd", "popular_movies.csv")
+    return os.getenv("MOVIEMIND_CATALOG_PATH", default)
@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import logging
+import threading
+import functools
+from collections import deque
+from typing import Dict, Optional
+
+logger = logging.getLogger("moviemind.metrics")
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    def __init__(self, registry, name: str, attributes: Dict):
+        self.registry = registry
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        stack = self.registry._stack()
+        self.parent = stack[-1] if stack else None
+        stack.append(self.name)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        self.registry._stack().pop()
+        self.registry._record_span(self.name, seconds, self.parent, exc_type is not None, self.attributes)
+        return False
+
+
+class MetricsRegistry:
+    """
+    Süreç içi metrik kaydı: sayaçlar, özet (count/sum/max) gözlemleri ve zaman aralıkları (span).
+    Kapalıyken tüm çağrılar tek bir bayrak kontrolüyle döner; ek yük neredeyse sıfırdır.
+    Kayıt ya kalıcı olarak (always_on: MOVIEMIND_METRICS, exporter) ya da performans panelini
+    açık tutan en az bir izleyici varken açıktır. Her span, logger "moviemind.metrics" INFO
+    seviyesinde açıksa JSON satırı olarak da loglanır.
+    """
+
+    def __init__(self, enabled: bool = False, recent_spans: int = 200, viewer_ttl: float = 1800):
+        self.enabled = enabled
+        self.always_on = enabled
+        self.viewer_ttl = viewer_ttl
+        self._viewers: Dict[str, float] = {}  # izleyici -> son görülme zamanı
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.counters: Dict[tuple, float] = {}
+        self.summaries: Dict[tuple, Dict[str, float]] = {}
+        self.recent = deque(maxlen=recent_spans)
+
+    def enable(self):
+        """
+        Ölçümü izleyicilerden bağımsız olarak kalıcı açar
+        """
+        with self._lock:
+            self.always_on = True
+            self.enabled = True
+
+    def set_viewer(self, viewer: str, watching: bool):
+        """
+        Paneli açan/kapatan izleyiciyi kaydeder. viewer_ttl saniyedir görülmeyen izleyiciler
+        (kapanmış oturumlar) düşülür; izleyici kalmayınca kayıt yeniden kapanır.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if watching:
+                self._viewers[viewer] = now
+            else:
+                self._viewers.pop(viewer, None)
+            self._viewers = {key: seen for key, seen in self._viewers.items() if now - seen <= self.viewer_ttl}
+            self.enabled = self.always_on or bool(self._viewers)
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @staticmethod
+    def _key(name: str, labels: Dict) -> tuple:
+        return (name, tuple(sorted(labels.items())))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            summary = self.summaries.setdefault(key, {'count': 0, 'sum': 0.0, 'max': 0.0})
+            summary['count'] += 1
+            summary['sum'] += value
+            summary['max'] = max(summary['max'], value)
+
+    def span(self, name: str, **attributes):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, name, attributes)
+
+    def timed(self, name: str):
+        """
+        Fonksiyon çağrısını bir span ile saran dekoratör
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Span(self, name, {}):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _record_span(self, name: str, seconds: float, parent: Optional[str], failed: bool, attributes: Dict):
+        self.observe('span_seconds', seconds, span=name)
+        record = {'span': name, 'parent': parent, 'ms': round(seconds * 1000, 3), 'error': failed, **attributes}
+        self.recent.append(record)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({'event': 'span', 'ts': time.time(), **record}, ensure_ascii=False, default=str))
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.summaries.clear()
+            self.recent.clear()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                'summaries': [
+                    {'name': name, 'labels': dict(labels), **summary}
+                    for (name, labels), summary in sorted(self.summaries.items())
+                ],
+                'recent_spans': list(self.recent),
+            }
+
+    def span_table(self):
+        """
+        Span başına çağrı sayısı, ortalama ve en yüksek süre (ms)
+        """
+        rows = []
+        with self._lock:
+            for (name, labels), summary in self.summaries.items():
+                if name != 'span_seconds':
+                    continue
+                rows.append({
+                    'span': dict(labels)['span'],
+                    'count': summary['count'],
+                    'avg_ms': round(summary['sum'] / summary['count'] * 1000, 3),
+                    'max_ms': round(summary['max'] * 1000, 3),
+                    'total_ms': round(summary['sum'] * 1000, 3),
+                })
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+    def render_prometheus(self, prefix: str = "moviemind") -> str:
+        """
+        Prometheus metin formatında (text exposition) çıktı üretir
+        """
+        def labels_text(labels):
+            if not labels:
+                return ''
+            escaped = [
+                f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                for key, value in labels
+            ]
+            return '{' + ','.join(escaped) + '}'
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                for (metric, labels), value in sorted(self.counters.items()):
+                    if metric == name:
+                        lines.append(f"{prefix}_{name}{labels_text(labels)} {value}")
+            for name in sorted({name for name, _ in self.summaries}):
+                lines.append(f"# TYPE {prefix}_{name} summary")
+                for (metric, labels), summary in sorted(self.summaries.items()):
+                    if metric == name:
+                        lines.append(f"{prefix}_{name}_count{labels_text(labels)} {summary['count']}")
+                        lines.append(f"{prefix}_{name}_sum{labels_text(labels)} {summary['sum']}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry(
+    enabled=os.getenv("MOVIEMIND_METRICS") == "1",
+    viewer_ttl=float(os.getenv("MOVIEMIND_SESSION_TTL", "1800"))
+)
+
+# Modül düzeyinde kısayollar: metrics.span(...), metrics.inc(...) vb.
+span = registry.span
+timed = registry.timed
+inc = registry.inc
+observe = registry.observe
+
+_exporter = None
+
+
+def start_exporter(port: int, host: str = "0.0.0.0"):
+    """
+    /metrics yolunda Prometheus metinlerini sunan arka plan HTTP sunucusunu (bir kez) başlatır
+    """
+    global _exporter
+    if _exporter is not None:
+        return _exporter
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    _exporter = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=_exporter.serve_forever, daemon=True).start()
+    return _exporter
+
+
+def start_exporter_from_env():
+    port = os.getenv("MOVIEMIND_METRICS_PORT")
+    if port:
+        registry.enable()
+        return start_exporter(int(port))
+    return None
+
@@ -0,0 +1,383 @@
+import os
+import re
+import time
+import atexit
+import platform
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import metrics
+from embedding_cache import EmbeddingCache
+from embedding_executor import EmbeddingExecutor, parse_workers
+
+PRIMARY_EMBEDDING_MODEL = 'sentence-transformers/paraphrase-MiniLM-L6-v2'
+FALLBACK_EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+
+# "torch": PyTorch fp32, "onnx": ONNX Runtime fp32, "onnx-int8": dinamik int8 kuantize ONNX
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def default_quantization_config() -> str:
+    """
+    İşlemciye uygun ONNX kuantizasyon profili (MOVIEMIND_ONNX_QCONFIG ile değiştirilebilir)
+    """
+    if os.getenv("MOVIEMIND_ONNX_QCONFIG"):
+        return os.getenv("MOVIEMIND_ONNX_QCONFIG")
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "arm64"
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            flags = f.read()
+    except OSError:
+        return "avx2"
+    if "avx512_vnni" in flags:
+        return "avx512_vnni"
+    return "avx512" if "avx512f" in flags else "avx2"
+
+
+class TTLCache:
+    """
+    Thread-safe LRU + TTL cache. Kapasite aşıldığında en uzun süredir kullanılmayan,
+    ttl saniyedir dokunulmayan kayıtlar da erişim sırasında silinir; silinen her kayıt
+    için (varsa) on_evict(key, value) çağrılır.
+    """
+
+    def __init__(self, max_size: int = 128, ttl: Optional[float] = None, on_evict: Optional[Callable] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (value, son erişim zamanı)
+        self._lock = threading.RLock()
+
+    def _collect_expired(self, now: float):
+        if self.ttl is None:
+            return []
+        expired = [key for key, (_, touched) in self._data.items() if now - touched > self.ttl]
+        return [(key, self._data.pop(key)[0]) for key in expired]
+
+    def _collect_overflow(self):
+        evicted = []
+        while len(self._data) > self.max_size:
+            key, (value, _) = self._data.popitem(last=False)
+            evicted.append((key, value))
+        return evicted
+
+    def _notify(self, evicted):
+        if self.on_evict:
+            for key, value in evicted:
+                self.on_evict(key, value)
+
+    def get(self, key, default=None):
+        with self._lock:
+            now = time.monotonic()
+            evicted = self._collect_expired(now)
+            if key in self._data:
+                value = self._data[key][0]
+                self._data[key] = (value, now)
+                self._data.move_to_end(key)
+                self.hits += 1
+            else:
+                value = default
+                self.misses += 1
+        self._notify(evicted)
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            now = time.monotonic()
+            evicted = self._collect_expired(now)
+            self._data[key] = (value, now)
+            self._data.move_to_end(key)
+            evicted += self._collect_overflow()
+        self._notify(evicted)
+
+    def get_or_create(self, key, factory: Callable):
+        with self._lock:
+            value = self.get(key)
+            if value is None:
+                value = factory()
+                self.set(key, value)
+            return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def expire(self):
+        with self._lock:
+            evicted = self._collect_expired(time.monotonic())
+        self._notify(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+
+class SharedEmbeddingModel:
+    """
+    Süreç genelinde paylaşılan, ilk encode çağrısında yüklenen thread-safe embedding modeli.
+    backend ile aynı modelin PyTorch, ONNX Runtime ya da int8 kuantize ONNX sürümü seçilir;
+    ONNX bağımlılıkları (sentence-transformers[onnx]) yoksa PyTorch'a düşülür.
+    """
+
+    def __init__(self, model_name: str = PRIMARY_EMBEDDING_MODEL, fallback_name: str = FALLBACK_EMBEDDING_MODEL,
+                 backend: str = "torch"):
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Bilinmeyen embedding backend'i: {backend}")
+        self.model_name = model_name
+        self.fallback_name = fallback_name
+        self.backend = backend
+        self.active_backend = None
+        self.backend_error = None
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        # Embedding cache'i bu adla anahtarlanır; farklı backend'lerin vektörleri karışmaz. Model
+        # yüklenmeden istenen backend'in adı döner (cache'teki metinler için model yüklenmez);
+        # yüklenirken yedek backend'e ya da yedek modele düşülürse ad ona göre değişir
+        backend = self.active_backend or self.backend
+        return self.model_name if backend == "torch" else f"{self.model_name}@{backend}"
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def _load_backend(self, model_name: str, cache_dir: str):
+        from sentence_transformers import SentenceTransformer
+
+        if self.backend == "onnx":
+            return SentenceTransformer(model_name, cache_folder=cache_dir, backend="onnx")
+        if self.backend == "onnx-int8":
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            # Kuantize model bir kez üretilip yerel klasörde saklanır
+            local_dir = os.path.join(cache_dir, "onnx-int8", re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name))
+            file_name = "onnx/model_qint8.onnx"
+            if not os.path.exists(os.path.join(local_dir, file_name)):
+                onnx_model = SentenceTransformer(model_name, cache_folder=cache_dir, backend="onnx")
+                onnx_model.save(local_dir)
+                export_dynamic_quantized_onnx_model(onnx_model, default_quantization_config(), local_dir, file_suffix="qint8")
+            return SentenceTransformer(local_dir, backend="onnx", model_kwargs={'file_name': file_name})
+        return SentenceTransformer(model_name, cache_folder=cache_dir)
+
+    def _load_any_backend(self, model_name: str, cache_dir: str):
+        if self.backend != "torch":
+            try:
+                model = self._load_backend(model_name, cache_dir)
+                self.active_backend = self.backend
+                return model
+            except Exception as e:
+                # Eksik bağımlılık (optimum/onnxruntime) ImportError ya da düz Exception olarak gelebilir
+                self.backend_error = f"{type(e).__name__}: {e}"
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(model_name, cache_folder=cache_dir)
+        self.active_backend = "torch"
+        return model
+
+    def _load(self):
+        # Set cache directory for Hugging Face models
+        cache_dir = os.getenv("TRANSFORMERS_CACHE", "/app/.cache")
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            return self._load_any_backend(self.model_name, cache_dir)
+        except Exception:
+            # Fallback to an even simpler model
+            self.model_name = self.fallback_name
+            return self._load_any_backend(self.model_name, cache_dir)
+
+    def get_model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def encode(self, texts, **kwargs):
+        model = self.get_model()
+        with self._encode_lock:
+            return model.encode(texts, **kwargs)
+
+
+_lock = threading.Lock()
+_embedding_models = {}
+_embedding_caches = {}
+_embedding_executors = {}
+_gemini_models = {}
+_chroma_client = None
+
+
+def get_embedding_model(backend: Optional[str] = None) -> SharedEmbeddingModel:
+    """
+    Backend başına paylaşılan model; backend verilmezse MOVIEMIND_EMBEDDING_BACKEND (varsayılan "torch")
+    """
+    backend = backend or os.getenv("MOVIEMIND_EMBEDDING_BACKEND", "torch")
+    with _lock:
+        if backend not in _embedding_models:
+            _embedding_models[backend] = SharedEmbeddingModel(backend=backend)
+        return _embedding_models[backend]
+
+
+def get_embedding_cache(model_name: str) -> EmbeddingCache:
+    with _lock:
+        if model_name not in _embedding_caches:
+            cache_dir = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(os.getenv("TRANSFORMERS_CACHE", "/app/.cache"), "embeddings"))
+            _embedding_caches[model_name] = EmbeddingCache(
+                cache_dir,
+                model_name,
+                max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+            )
+        return _embedding_caches[model_name]
+
+
+def get_embedding_executor(model) -> EmbeddingExecutor:
+    """
+    Model başına paylaşılan encode yürütücüsü; MOVIEMIND_EMBED_WORKERS ("auto" ya da sayı)
+    1'den büyükse büyük encode işleri süreç havuzuna dağıtılır
+    """
+    with _lock:
+        # Yürütücü modeli tuttuğu için id(model) süreç boyunca başka bir modele geçmez
+        executor = _embedding_executors.get(id(model))
+        if executor is None:
+            executor = _embedding_executors[id(model)] = EmbeddingExecutor(
+                model,
+                workers=parse_workers(os.getenv("MOVIEMIND_EMBED_WORKERS", "1")),
+                min_parallel_texts=int(os.getenv("MOVIEMIND_EMBED_MIN_PARALLEL", "2048"))
+            )
+        return executor
+
+
+@atexit.register
+def _close_embedding_executors():
+    for executor in list(_embedding_executors.values()):
+        executor.close()
+
+
+@atexit.register
+def _close_embedding_caches():
+    # Journal'daki son kayıtlar index.json'a yazılır ve klasör kilidi bırakılır
+    for cache in list(_embedding_caches.values()):
+        cache.close()
+
+
+def get_chroma_client():
+    global _chroma_client
+    with _lock:
+        if _chroma_client is None:
+            import chromadb
+
+            # Set up ChromaDB with proper cache directory
+            cache_dir = os.getenv("CHROMA_CACHE_DIR", "/app/.cache")
+            os.makedirs(cache_dir, exist_ok=True)
+            _chroma_client = chromadb.PersistentClient(path="./chroma_db")
+        return _chroma_client
+
+
+def get_gemini_model(api_key: str, model_name: str = 'gemini-1.5-flash'):
+    """
+    Gemini istemcisini anahtar başına bir kez yapılandırır ve model nesnesini oturumlar ve
+    Streamlit yeniden çalıştırmaları arasında paylaştırır
+    """
+    with _lock:
+        key = (api_key, model_name)
+        if key not in _gemini_models:
+            import google.generativeai as genai
+
+            genai.configure(api_key=api_key)
+            _gemini_models[key] = genai.GenerativeModel(model_name)
+        return _gemini_models[key]
+
+
+class TokenBucket:
+    """
+    Thread-safe token kovası hız sınırlayıcısı: saniyede rate token dolar, en fazla capacity
+    token birikir (ani yük payı). acquire() yeterli token birikene kadar bekler.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Token alınana kadar bekler; beklenen toplam süreyi saniye olarak döndürür
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def _create_gemini_rate_limiter() -> Optional[TokenBucket]:
+    rpm = float(os.getenv("GEMINI_RATE_LIMIT_RPM", "0"))
+    if rpm <= 0:
+        return None
+    burst = os.getenv("GEMINI_RATE_LIMIT_BURST")
+    return TokenBucket(rpm / 60, capacity=float(burst) if burst else None)
+
+
+# Süreçteki tüm oturumların Gemini çağrılarını paylaştığı hız sınırı (ayarlanmamışsa sınırsız)
+gemini_rate_limiter = _create_gemini_rate_limiter()
+
+# Veri parmak izi -> profil istatistikleri; aynı veri için yeniden çalıştırmalarda yeniden hesaplanmaz
+profile_cache = TTLCache(max_size=int(os.getenv("MOVIEMIND_MAX_SESSIONS", "32")))
+
+
+# (model, sorgu, genişletme açık mı) -> genişletilmiş sorguların embedding'leri; indeksten
+# bağımsız olduğundan tüm oturumlar paylaşır ("aksiyon", "korku" gibi sorgular modele bir kez gider)
+query_embedding_cache = TTLCache(
+    max_size=int(os.getenv("MOVIEMIND_QUERY_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("MOVIEMIND_QUERY_CACHE_TTL", "3600"))
+)
+
+
+# (sorgu, ilk 5 film, izlenenler hash'i, model) anahtarlı LLM yanıt cache'i
+response_cache = TTLCache(
+    max_size=int(os.getenv("MOVIEMIND_RESPONSE_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("MOVIEMIND_RESPONSE_CACHE_TTL", "3600"))
+)
+
+
+def _release_session(session_id, rag):
+    # Atılan oturum performans panelini açık bıraktıysa ölçümü açık tutmaya devam etmesin
+    metrics.registry.set_viewer(session_id, False)
+    rag.release()
+
+
+# Kullanıcı oturumu başına MovieMindRAG; boşta kalanlar LRU/TTL ile bellekten atılır
+session_registry = TTLCache(
+    max_size=int(os.getenv("MOVIEMIND_MAX_SESSIONS", "32")),
+    ttl=float(os.getenv("MOVIEMIND_SESSION_TTL", "1800")),
+    on_evict=_release_session
+)
+
+
+def get_session_rag(session_id: str, factory: Callable):
+    """
+    Oturuma ait MovieMindRAG örneğini döndürür; yoksa (veya boşta kalıp atıldıysa) factory ile oluşturur
+    """
+    return session_registry.get_or_create(session_id, factory)
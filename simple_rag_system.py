@@ -1,69 +1,382 @@
 import os
+import json
+import time
+import queue
+import hashlib
+import functools
+import threading
 import pandas as pd
-from typing import List, Dict
-from sentence_transformers import SentenceTransformer
-import chromadb
-import google.generativeai as genai
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+import numpy as np
 from dotenv import load_dotenv
 
+import metrics
+import resources
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from letterboxd_export import EXTRA_TABLES, REVIEW_COLUMNS, LetterboxdExport, ReviewIndex
+from local_recommender import CandidateCatalog, build_taste_vector, catalog_path, normalize_rows
+from vector_store import NumpyVectorStore
+from generation import (
+    GenerationCancelled, GenerationTimeout, StubGenerativeModel, TitleIndex,
+    estimate_tokens, parse_recommendations, response_cache_key, stream_generate
+)
+
+def _coerce_int(value) -> int:
+    try:
+        if pd.notna(value):
+            return int(value)
+    except Exception:
+        pass
+    return -1
+
+
+def _coerce_float(value) -> float:
+    try:
+        if pd.notna(value):
+            return float(value)
+    except Exception:
+        pass
+    return -1.0
+
+
+def _int_column(df: pd.DataFrame, name: str) -> np.ndarray:
+    """
+    Kolonu int'e çevirir; boş/çevrilemeyen değerler -1 olur. Sayısal NumPy kolonları
+    vektörel, diğerleri (metin, nullable vb.) satır bazlı aynı kuralla çevrilir.
+    """
+    if name not in df.columns:
+        return np.full(len(df), -1, dtype=np.int64)
+    column = df[name]
+    if isinstance(column.dtype, np.dtype) and (pd.api.types.is_integer_dtype(column) or pd.api.types.is_bool_dtype(column)):
+        return column.to_numpy(dtype=np.int64)
+    if isinstance(column.dtype, np.dtype) and pd.api.types.is_float_dtype(column):
+        values = column.to_numpy(dtype=np.float64)
+        finite = np.isfinite(values)
+        return np.where(finite, np.trunc(np.where(finite, values, 0)), -1).astype(np.int64)
+    return np.fromiter((_coerce_int(value) for value in column.to_numpy()), dtype=np.int64, count=len(column))
+
+
+def _float_column(df: pd.DataFrame, name: str) -> np.ndarray:
+    if name not in df.columns:
+        return np.full(len(df), -1.0, dtype=np.float64)
+    column = df[name]
+    if isinstance(column.dtype, np.dtype) and pd.api.types.is_numeric_dtype(column):
+        values = column.to_numpy(dtype=np.float64)
+        return np.where(np.isnan(values), -1.0, values)
+    return np.fromiter((_coerce_float(value) for value in column.to_numpy()), dtype=np.float64, count=len(column))
+
+
+def _text_column(df: pd.DataFrame, name: str) -> pd.Series:
+    """
+    Kolonu kırpılmış metne çevirir; boş değerler '' olur
+    """
+    if name not in df.columns:
+        return pd.Series([''] * len(df), dtype=object)
+    column = pd.Series(df[name].to_numpy(), dtype=object)
+    if pd.api.types.infer_dtype(column, skipna=True) == 'string':
+        return column.where(column.notna(), '').str.strip()
+    return column.map(lambda value: str(value).strip() if pd.notna(value) else '')
+
+
+def holds_index(method):
+    """
+    Metot çalışırken oturumu kullanımda sayar; bu sırada gelen release() indeksi metot bitince bırakır
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.in_use():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class MovieMindRAG:
-    def __init__(self):
+    def __init__(self, namespace: Optional[str] = None):
         load_dotenv()
         self.api_key = os.getenv("GEMINI_API_KEY")
-        
-        # Set cache directory for Hugging Face models
-        cache_dir = os.getenv("TRANSFORMERS_CACHE", "/app/.cache")
-        os.makedirs(cache_dir, exist_ok=True)
-        
-        # Use a more compatible model for Hugging Face Spaces
-        try:
-            self.embedding_model = SentenceTransformer('sentence-transformers/paraphrase-MiniLM-L6-v2', cache_folder=cache_dir)
-        except Exception as e:
-            # Fallback to an even simpler model
-            self.embedding_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2', cache_folder=cache_dir)
-        
-        # Set up ChromaDB with proper cache directory
-        cache_dir = os.getenv("CHROMA_CACHE_DIR", "/app/.cache")
-        os.makedirs(cache_dir, exist_ok=True)
-        
-        self.client = chromadb.PersistentClient(path="./chroma_db")
+
+        # Embedding modeli ve cache'i süreç genelinde paylaşılır; model ilk encode çağrısında yüklenir
+        self.embedding_model = resources.get_embedding_model()
+        self._embedding_cache = None
+
+        # Vektör arama motoru: kişisel kütüphaneler için bellek içi "numpy",
+        # büyük veya kalıcı indeksler için "chroma"
+        self.vector_backend = os.getenv("MOVIEMIND_VECTOR_BACKEND", "numpy")
+        self.client = resources.get_chroma_client() if self.vector_backend == "chroma" else None
+
+        # Her kullanıcı kendi isim alanındaki koleksiyona yazar; biri yenilerken diğerininkini silmez
+        self.namespace = namespace
+        self.collection_name = "movies" if not namespace else f"movies_{hashlib.sha1(namespace.encode('utf-8')).hexdigest()[:16]}"
         self.collection = None
         self.gemini_model = None
+
+        # Üretim ayarları: akış, saniye cinsinden zaman aşımı, yanıt cache'i ve Gemini hız sınırı
+        self.enable_streaming = True
+        self.generation_timeout = float(os.getenv("GEMINI_TIMEOUT", "60"))
+        self.response_cache = resources.response_cache
+        self.rate_limiter = resources.gemini_rate_limiter
+
+        # Prompt modu: "full" izlenen tüm filmleri prompt'a yazar; "bounded" prompt'u sabit boyutta
+        # tutar, fazladan aday ister ve izlenenleri yanıt geldikten sonra başlık indeksiyle eler
+        self.prompt_mode = os.getenv("MOVIEMIND_PROMPT_MODE", "full")
+        self.bounded_candidate_count = 8
+        self.min_recommendations = 3
+        self.max_recommendations = 5
+        self.max_reprompts = 2
         
         # Augmentation ayarları
         self.enable_document_augmentation = True
         self.enable_query_augmentation = True
 
+        # Doküman temsili: "variants" (her varyasyon ayrı vektör), "pooled" (film başına
+        # varyasyonların ortalaması/maksimumu tek vektör) veya "multivector" (varyasyonlar
+        # tek film satırında, max-sim skorlama; yalnızca numpy motorunda)
+        self.document_representation = os.getenv("MOVIEMIND_DOC_REPRESENTATION", "variants")
+        self.pooling = os.getenv("MOVIEMIND_POOLING", "mean")
+
+        # İndeks senkronizasyon ayarları: CSV'ler ingest_chunk_rows satırlık parçalarla okunur, dokümanlar
+        # index_batch_size metinlik batch'lerle encode edilir; yazıcı thread'i en fazla write_queue_size
+        # batch geride kalabilir, böylece bellekteki doküman ve embedding sayısı export boyutundan bağımsız
+        # kalır (puan tablosunun kendisi profil analizi ve indeksin yeniden kurulması için tümüyle tutulur)
+        self.index_batch_size = int(os.getenv("MOVIEMIND_INDEX_BATCH_SIZE", "512"))
+        self.ingest_chunk_rows = int(os.getenv("MOVIEMIND_INGEST_CHUNK_ROWS", "5000"))
+        self.write_queue_size = 2
+        self.last_sync_stats = {}
+
+        # İzlenen filmler kümesi: (başlık, yıl) -> {title, year, uri}; indeks değiştikçe yenilenir
+        self.watched_index = {}
+        self.watched_exclusion_list = []
+        self.watched_title_index = TitleIndex([])
+
+        # Başlık/yıl/yorum üzerinde BM25 indeksi; vektör sonuçlarıyla RRF ile birleştirilir
+        self.enable_lexical_search = True
+        self.lexical_index = BM25Index()
+        self.rrf_k = 60
+
+        # Sorgu tarafı cache'leri: genişletilmiş sorgu embedding'leri oturumlar arasında paylaşılır;
+        # arama sonuçları oturuma özeldir ve index_version ile anahtarlanır, indeks değişince geçersizleşir
+        self.query_cache = resources.query_embedding_cache
+        self.search_cache = resources.TTLCache(max_size=int(os.getenv("MOVIEMIND_SEARCH_CACHE_SIZE", "128")))
+        self.index_version = 0
+
+        # Öneri motoru: "local" önerileri puan ağırlıklı zevk vektörü ve sorguyla aday kataloğundan
+        # milisaniyeler içinde seçer, Gemini (varsa) yalnızca bu adayları yeniden sıralayıp açıklar;
+        # "gemini" önerileri tamamen Gemini'ye ürettirir
+        self.recommender = os.getenv("MOVIEMIND_RECOMMENDER", "local")
+        self.enable_llm_rerank = os.getenv("MOVIEMIND_LLM_RERANK", "1") == "1"
+        self.catalog_path = catalog_path()
+        self.query_weight = 0.5
+        self.local_candidate_count = 10
+        self.candidate_catalog = None
+        self._catalog_key = None
+        self._taste_profiles = {}
+        self.watchlist_title_index = TitleIndex([])
+        self.export_watched_title_index = TitleIndex([])
+
+        # Exporttaki diğer tablolar (diary, watched, watchlist, likes/films, profile)
+        self.export_tables = {}
+
+        # Oturumu o an kullanan çağrı sayısı; kullanımdayken gelen release() son kullanım bitene ertelenir
+        self._users = 0
+        self._release_pending = False
+        self._users_lock = threading.Lock()
+
+    @metrics.timed("rag.setup_gemini")
     def setup_gemini(self):
+        # Streamlit her etkileşimde çağırır; model bir kez kurulur
+        if self.gemini_model is not None:
+            return True
+        # Ağ erişimi olmadan çalıştırmak için yerel stub model
+        if os.getenv("MOVIEMIND_LLM") == "stub":
+            self.gemini_model = StubGenerativeModel()
+            return True
         if not self.api_key:
             return False
-        genai.configure(api_key=self.api_key)
-        self.gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+        self.gemini_model = resources.get_gemini_model(self.api_key)
         return True
         
-    def load_letterboxd_data(self, folder_path: str):
-        ratings_df = pd.read_csv(f"{folder_path}/ratings.csv")
-        ratings_df['Watched'] = True
+    @property
+    def embedding_model_name(self) -> str:
+        return getattr(self.embedding_model, 'name', type(self.embedding_model).__name__)
+
+    @property
+    def embedding_cache(self):
+        if self._embedding_cache is not None:
+            return self._embedding_cache
+        return resources.get_embedding_cache(self.embedding_model_name)
+
+    @embedding_cache.setter
+    def embedding_cache(self, cache):
+        self._embedding_cache = cache
+
+    @contextmanager
+    def in_use(self):
+        with self._users_lock:
+            self._users += 1
+        try:
+            yield self
+        finally:
+            with self._users_lock:
+                self._users -= 1
+                if self._users == 0 and self._release_pending:
+                    self._release_pending = False
+                    self._release_index()
+
+    def release(self):
+        """
+        Oturum bellekten atılırken indeksini bırakır; oturuma özel Chroma koleksiyonunu siler.
+        Oturum o an kullanılıyorsa (ingest, arama, öneri) indeks son kullanım bitince bırakılır.
+        """
+        with self._users_lock:
+            if self._users:
+                self._release_pending = True
+            else:
+                self._release_index()
+
+    def _release_index(self):
+        if self.vector_backend == "chroma" and self.namespace and self.client is not None:
+            try:
+                self.client.delete_collection(self.collection_name)
+            except Exception:
+                pass
+        self.collection = None
+        self.watched_index = {}
+        self.watched_exclusion_list = []
+        self.watched_title_index = TitleIndex([])
+        self.lexical_index = BM25Index()
+        self.invalidate_search_cache()
+
+    def invalidate_search_cache(self):
+        """
+        İndeks değiştiğinde çağrılır: sürüm artar, önceki sürümle hesaplanan aramalar ve zevk profilleri atılır
+        """
+        self.index_version += 1
+        self.search_cache.clear()
+        self._taste_profiles = {}
+
+    @property
+    def embedding_executor(self):
+        return resources.get_embedding_executor(self.embedding_model)
+
+    def _model_encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        metrics.inc('embedding_calls_total')
+        metrics.observe('embedding_batch_size', len(texts))
+        with metrics.span("embedding.model_encode", batch_size=len(texts)):
+            return self.embedding_executor.encode(texts, **kwargs)
+
+    @metrics.timed("rag.encode_texts")
+    def encode_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Metinleri embedding cache üzerinden encode eder; cache'te olmayanlar modele gider
+        """
+        cache = self.embedding_cache
+        # Model henüz yüklenmediyse cache adı istenen backend'e göredir; yükleme yedeğe düşerse
+        # bu çağrının yeni eklediği vektörler o cache'ten silinip doğru cache'e yeniden yazılır
+        fresh = [] if getattr(self.embedding_model, 'loaded', True) else [text for text in texts if not cache.contains(text)]
+        hits, misses = cache.hits, cache.misses
+        embeddings = cache.encode(texts, self._model_encode)
+        metrics.inc('cache_lookups_total', cache.hits - hits, cache='embedding', result='hit')
+        metrics.inc('cache_lookups_total', cache.misses - misses, cache='embedding', result='miss')
+        if self._embedding_cache is None and cache.model_name != self.embedding_model_name:
+            cache.discard(fresh)
+            return self.encode_texts(texts)
+        return embeddings
+
+    def _collection_call(self, operation: str, **kwargs):
+        """
+        Koleksiyon çağrısını sayar ve süresini ölçer (query, get, upsert, delete, search_films)
+        """
+        metrics.inc('vector_store_calls_total', operation=operation, backend=self.vector_backend)
+        with metrics.span(f"vector_store.{operation}"):
+            return getattr(self.collection, operation)(**kwargs)
+
+    @metrics.timed("rag.load_letterboxd_data")
+    def load_letterboxd_data(self, source):
+        """
+        Exportu okur. source bir klasör, export ZIP'i (yol, bytes ya da dosya benzeri nesne) veya
+        {'ratings.csv': ..., 'reviews.csv': ...} sözlüğü olabilir; dosya sistemine hiçbir şey yazılmaz.
+        """
+        export = LetterboxdExport.open(source)
+        df = self.prepare_ratings(export.read_csv('ratings'), self.review_index(export))
+        self.load_export_tables(export)
         
+        return df
+
+    def load_export_tables(self, source):
+        """
+        Puan ve yorum dışındaki tabloları export_tables'a okur; izleme listesindeki filmler
+        yerel önerilerden dışlanacak başlık indeksine yüklenir
+        """
+        export = LetterboxdExport.open(source)
+        tables = {}
+        for name in EXTRA_TABLES:
+            if export.has(name):
+                try:
+                    tables[name] = export.read_csv(name)
+                except Exception:
+                    pass
+        self.set_export_tables(tables)
+
+    def set_export_tables(self, tables: Dict[str, pd.DataFrame]):
+        """
+        Export tablolarını ve onlardan türeyen dışlama indekslerini kurar (indeks yeniden kurulurken de kullanılır)
+        """
+        self.export_tables = tables
+        self.watchlist_title_index = TitleIndex(self._table_films(tables.get('watchlist')))
+        # watched.csv puanlanmamış izlemeleri de içerir; bunlar indekste izlenen olarak görünmez
+        self.export_watched_title_index = TitleIndex(self._table_films(tables.get('watched')))
+
+    @staticmethod
+    def _table_films(table_df: Optional[pd.DataFrame]) -> List[tuple]:
+        """
+        Export tablosundaki (başlık, yıl) çiftleri; tablo yoksa ya da okunamıyorsa boş liste
+        """
+        if table_df is None:
+            return []
+        try:
+            title_column = 'Name' if 'Name' in table_df.columns else 'Title'
+            years = table_df['Year'] if 'Year' in table_df.columns else [None] * len(table_df)
+            return [
+                (str(title).strip(), _coerce_int(year))
+                for title, year in zip(table_df[title_column], years)
+                if pd.notna(title)
+            ]
+        except Exception:
+            return []
+
+    def iter_letterboxd_data(self, source, chunksize: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """
+        ratings.csv'yi parça parça okur ve her parçaya yorumları indeksli eşleştirmeyle ekler;
+        bellekte aynı anda tek bir puan parçası ve yorum indeksi bulunur
+        """
+        export = LetterboxdExport.open(source)
+        reviews = self.review_index(export)
+        for ratings_df in export.read_csv('ratings', chunksize=chunksize or self.ingest_chunk_rows):
+            yield self.prepare_ratings(ratings_df, reviews)
+
+    def review_index(self, export: LetterboxdExport) -> Optional[ReviewIndex]:
+        if not export.has('reviews'):
+            return None
+        try:
+            return ReviewIndex(export.read_csv('reviews', usecols=lambda column: column in REVIEW_COLUMNS))
+        except Exception:
+            return None
+
+    def prepare_ratings(self, ratings_df: pd.DataFrame, reviews: Optional[ReviewIndex]) -> pd.DataFrame:
+        ratings_df['Watched'] = True
+
         if 'Rating' not in ratings_df.columns:
             ratings_df['Rating'] = 0.0
 
-        review_path = f"{folder_path}/reviews.csv"
-        if os.path.exists(review_path):
+        if reviews is not None:
             try:
-                reviews_df = pd.read_csv(review_path)
-                ratings_df = ratings_df.merge(
-                    reviews_df[['Name', 'Year', 'Review']],
-                    on=['Name', 'Year'], how='left'
-                )
+                ratings_df = reviews.attach(ratings_df)
             except Exception:
                 ratings_df['Review'] = ''
         else:
             ratings_df['Review'] = ''
 
-        df = ratings_df
-        
-        return df
+        return ratings_df
     
     def augment_document(self, name: str, year: int, rating: float, review: str) -> List[str]:
         """
@@ -152,114 +465,489 @@ class MovieMindRAG:
         # Maksimum 5 query döndür (performans için)
         return augmented_queries[:5]
     
+    @metrics.timed("rag.build_document_columns")
+    def build_document_columns(self, df: pd.DataFrame):
+        """
+        Dokümanları satır satır gezmeden, kolon işlemleriyle üretir.
+        Encode'a doğrudan verilebilecek paralel (ids, texts, metadatas, reviews) listeleri döndürür;
+        create_movie_documents'in önceki satır bazlı (iterrows) çıktısıyla birebir aynıdır.
+        reviews, BM25 indeksinin şablon metni yerine kullandığı ham yorumlardır.
+        """
+        if len(df) == 0:
+            return [], [], [], []
+
+        if 'Name' in df.columns:
+            names = pd.Series(df['Name'].to_numpy(), dtype=object)
+            if pd.api.types.infer_dtype(names, skipna=False) == 'string':
+                names = names.str.strip()
+            else:
+                names = names.map(lambda value: str(value or '').strip())
+        else:
+            names = pd.Series([''] * len(df), dtype=object)
+        years = _int_column(df, 'Year')
+        ratings = _float_column(df, 'Rating')
+        uris = _text_column(df, 'Letterboxd URI')
+        reviews = _text_column(df, 'Review')
+        if 'Watched' in df.columns and pd.api.types.is_bool_dtype(df['Watched']) and isinstance(df['Watched'].dtype, np.dtype):
+            watched = df['Watched'].to_numpy()
+        elif 'Watched' in df.columns:
+            watched = np.array([bool(value) for value in df['Watched'].to_numpy()], dtype=bool)
+        else:
+            watched = np.zeros(len(df), dtype=bool)
+
+        has_year = pd.Series(years != -1)
+        has_rating = pd.Series(ratings >= 0)
+        has_review = reviews != ''
+        year_text = pd.Series(years.astype(str), dtype=object)
+        rating_text = pd.Series(ratings.astype(str), dtype=object)
+        empty = pd.Series([''] * len(df), dtype=object)
+
+        def year_or(label):
+            return year_text.where(has_year, label)
+
+        def when(condition, text):
+            return text.where(condition, empty)
+
+        # augment_document ile aynı şablonlar, kolon bazında
+        text1 = ("Film: " + names + " (" + year_or('Yıl yok') + ")"
+                 + when(has_rating, " | Puan: " + rating_text + "/5")
+                 + when(has_review, " | Yorum: " + reviews))
+        if self.enable_document_augmentation:
+            text2 = (names + " adlı " + year_or('bilinmeyen yıl') + " yapımı film"
+                     + when(has_rating, " | Kullanıcı puanı: " + rating_text + "/5")
+                     + when(has_review, " | İnceleme: " + reviews))
+            text3 = ("Film adı: " + names
+                     + when(has_year, " | Yapım yılı: " + year_text)
+                     + when(has_rating, " | Değerlendirme: " + rating_text + " yıldız")
+                     + when(has_review, " | Kullanıcı yorumu: " + reviews))
+            text4 = (names + " (" + year_or('Bilinmeyen yıl') + ") - " + rating_text
+                     + "/5 puanlı bir film. İnceleme: " + reviews).where(has_rating & has_review, None)
+            variants = [text1, text2, text3, text4]
+        else:
+            variants = [text1]
+
+        # Satır başına varyasyonlar yan yana; satır sırasıyla düzleştirilip olmayan 4. varyasyon atılır
+        texts_grid = np.column_stack([variant.to_numpy(dtype=object) for variant in variants])
+        present = np.column_stack([variant.notna().to_numpy() for variant in variants])
+        row_of_doc, variant_of_doc = np.nonzero(present)
+        texts = texts_grid[row_of_doc, variant_of_doc].tolist()
+
+        base_ids = (names + "_" + year_text).to_numpy(dtype=object)
+        name_list = names.tolist()
+        year_list = years.tolist()
+        rating_list = ratings.tolist()
+        watched_list = watched.tolist()
+        uri_list = uris.tolist()
+        review_list = reviews.tolist()
+
+        ids = []
+        metadatas = []
+        doc_reviews = []
+        augmented = self.enable_document_augmentation
+        for row, idx in zip(row_of_doc.tolist(), variant_of_doc.tolist()):
+            metadata = {
+                'title': name_list[row],
+                'year': year_list[row],
+                'rating': rating_list[row],
+                'watched': watched_list[row],
+                'uri': uri_list[row]
+            }
+            if augmented:
+                metadata['augmented'] = True
+                metadata['aug_index'] = idx
+                ids.append(f"{base_ids[row]}_aug{idx}")
+            else:
+                ids.append(base_ids[row])
+            metadatas.append(metadata)
+            doc_reviews.append(review_list[row])
+        return ids, texts, metadatas, doc_reviews
+
+    @metrics.timed("rag.create_movie_documents")
     def create_movie_documents(self, df: pd.DataFrame) -> List[Dict]:
-        documents = []
-        
-        for _, row in df.iterrows():
-            name_val = str(row.get('Name', '') or '').strip()
-            year_raw = row.get('Year')
-            year_val = -1
-            try:
-                if pd.notna(year_raw):
-                    year_val = int(year_raw)
-            except Exception:
-                year_val = -1
-            rating_raw = row.get('Rating')
-            rating_val = -1.0
+        ids, texts, metadatas, reviews = self.build_document_columns(df)
+        return [
+            {'id': doc_id, 'text': text, 'metadata': metadata, 'review': review}
+            for doc_id, text, metadata, review in zip(ids, texts, metadatas, reviews)
+        ]
+
+    def iter_movie_documents(self, data, on_rows: Optional[Callable[[int], None]] = None) -> Iterator[Dict]:
+        """
+        DataFrame'i ya da DataFrame parçalarını index_batch_size satırlık dilimler halinde dokümanlara
+        çevirir (lazy); her dilimden sonra on_rows(işlenen satır sayısı) çağrılır
+        """
+        chunks = [data] if isinstance(data, pd.DataFrame) else data
+        for chunk in chunks:
+            for start in range(0, len(chunk), self.index_batch_size):
+                part = chunk.iloc[start:start + self.index_batch_size]
+                yield from self.create_movie_documents(part)
+                if on_rows:
+                    on_rows(len(part))
+
+    @metrics.timed("rag.ingest_letterboxd")
+    @holds_index
+    def ingest_letterboxd(self, source, incremental: bool = True,
+                          progress_callback: Optional[Callable[[float], None]] = None):
+        """
+        Letterboxd exportunu (klasör, ZIP ya da bellekteki CSV'ler; bkz. load_letterboxd_data)
+        okuma → doküman → embedding → indeks hattında akış halinde işler: dokümanlar ve embedding'ler
+        batch batch üretilip yazılır. Puan tablosunun parçaları ise sonda birleştirildiğinden tablo
+        bellekte tümüyle bulunur. progress_callback, işlenen puan satırı oranıyla (0-1) çağıran
+        thread'de çağrılır. Profil analizi için birleştirilmiş tabloyu ve indeks satır sayısını döndürür.
+        """
+        export = LetterboxdExport.open(source)
+        total_rows = export.count_rows('ratings')
+        chunks = []
+        done = [0]
+
+        def read_chunks():
+            for chunk in self.iter_letterboxd_data(export):
+                chunks.append(chunk)
+                yield chunk
+
+        def count_rows(rows: int):
+            done[0] += rows
+
+        def report(_progress):
+            if progress_callback and total_rows:
+                progress_callback(min(1.0, done[0] / total_rows))
+
+        count = self.setup_vector_database(
+            self.iter_movie_documents(read_chunks(), on_rows=count_rows),
+            incremental=incremental,
+            progress_callback=report
+        )
+        df = pd.concat(chunks, ignore_index=True)
+        self.load_export_tables(export)
+        return df, count
+
+    def open_collection(self, reset: bool = False):
+        """
+        Seçili vektör arama motorundaki koleksiyonu açar; reset=True ise boşaltır
+        """
+        if self.vector_backend == "numpy":
+            if reset or not isinstance(self.collection, NumpyVectorStore):
+                self.collection = NumpyVectorStore(self.collection_name)
+            return self.collection
+
+        if self.client is None:
+            self.client = resources.get_chroma_client()
+        if reset:
             try:
-                if pd.notna(rating_raw):
-                    rating_val = float(rating_raw)
+                self.client.delete_collection(self.collection_name)
             except Exception:
-                rating_val = -1.0
-
-            review_text = ''
-            if pd.notna(row.get('Review')) and str(row['Review']).strip():
-                review_text = str(row['Review']).strip()
-
-            # Augmentation kullanılıyorsa, birden fazla doküman versiyonu oluştur
-            if self.enable_document_augmentation:
-                augmented_texts = self.augment_document(name_val, year_val, rating_val, review_text)
-                # Her augment edilmiş versiyon için ayrı doküman oluştur
-                for idx, text in enumerate(augmented_texts):
-                    documents.append({
-                        'id': f"{name_val}_{year_val}_aug{idx}",
-                        'text': text,
-                        'metadata': {
-                            'title': name_val,
-                            'year': int(year_val),
-                            'rating': float(rating_val),
-                            'watched': bool(row.get('Watched', False)),
-                            'augmented': True,
-                            'aug_index': idx
-                        }
-                    })
-            else:
-                # Augmentation kapalıysa, sadece standart format
-                text = f"Film: {name_val} ({year_val if year_val != -1 else 'Yıl yok'})"
-                if rating_val >= 0:
-                    text += f" | Puan: {rating_val}/5"
-                if review_text:
-                    text += f" | Yorum: {review_text}"
-                
-                documents.append({
-                    'id': f"{name_val}_{year_val}",
-                    'text': text,
-                    'metadata': {
-                        'title': name_val,
-                        'year': int(year_val),
-                        'rating': float(rating_val),
-                        'watched': bool(row.get('Watched', False))
-                    }
-                })
-        
-        return documents
-    
-    def setup_vector_database(self, documents: List[Dict]):
+                pass
+        self.collection = self.client.get_or_create_collection(self.collection_name)
+        return self.collection
+
+    def document_hash(self, document: Dict) -> str:
+        """
+        Dokümanın metni ve metadatası (gruplanmış satırlarda tüm varyasyon metinleri) ile embedding modeli
+        ve temsil üzerinden içerik hash'i üretir; model değişince eski vektörler "değişmemiş" sayılmaz
+        """
+        payload = {
+            'text': document['text'],
+            'metadata': document['metadata'],
+            'model': self.embedding_model_name,
+            'representation': self.active_representation(),
+        }
+        if payload['representation'] == "pooled":
+            payload['pooling'] = self.pooling
+        if 'variants' in document:
+            payload['texts'] = list(document['variants'].values())
+        payload = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def active_representation(self) -> str:
+        # Chroma satır başına tek vektör tuttuğundan multivector orada variants'a düşer
+        if self.document_representation == "multivector" and self.vector_backend != "numpy":
+            return "variants"
+        return self.document_representation
+
+    def build_index_rows(self, documents: List[Dict]) -> Dict[str, Dict]:
+        """
+        Dokümanları seçili temsile göre indekse yazılacak satırlara dönüştürür (id -> satır).
+        Gruplanan temsillerde aynı filmin varyasyonları tek satırda toplanır.
+        """
+        representation = self.active_representation()
+        rows = {}
+        if representation == "variants":
+            # Aynı id'ye sahip dokümanlardan sonuncusu geçerli olur
+            for doc in documents:
+                rows[doc['id']] = doc
+            return rows
+
+        for doc in documents:
+            metadata = doc['metadata']
+            film_id = f"{metadata['title']}_{metadata['year']}"
+            row = rows.get(film_id)
+            if row is None:
+                row = rows[film_id] = {'id': film_id, 'text': doc['text'], 'review': doc.get('review', ''), 'variants': {}}
+            row['metadata'] = {
+                **{key: value for key, value in metadata.items() if key not in ('augmented', 'aug_index')},
+                'representation': representation if representation == "multivector" else f"pooled-{self.pooling}",
+            }
+            row['variants'][doc['id']] = doc['text']
+        return rows
+
+    def embed_index_rows(self, rows: List[Dict]):
+        """
+        Satırların varyasyon metinlerini tek encode çağrısıyla embed eder ve temsile göre
+        satır başına tek vektör (variants/pooled) ya da vektör listesi (multivector) döndürür
+        """
+        texts_per_row = [list(row['variants'].values()) if 'variants' in row else [row['text']] for row in rows]
+        embeddings = self.encode_texts([text for texts in texts_per_row for text in texts])
+
+        representation = self.active_representation()
+        if representation == "variants":
+            return embeddings
+
+        grouped = []
+        start = 0
+        for texts in texts_per_row:
+            grouped.append(embeddings[start:start + len(texts)])
+            start += len(texts)
+        if representation == "multivector":
+            return grouped
+
+        pool = np.max if self.pooling == "max" else np.mean
+        return np.vstack([pool(vectors, axis=0) for vectors in grouped])
+
+    def index_batch_texts(self) -> int:
+        # Süreç havuzu açıksa batch'ler havuza dağıtılmaya değecek kadar büyük tutulur
+        executor = self.embedding_executor
+        if executor.parallel:
+            return max(self.index_batch_size, executor.min_parallel_texts)
+        return self.index_batch_size
+
+    def iter_index_batches(self, documents: Iterable[Dict]) -> Iterator[Dict[str, Dict]]:
+        """
+        Doküman akışını yaklaşık index_batch_texts() metinlik indeks satırı batch'lerine böler;
+        bir filmin varyasyonları aynı batch'te kalsın diye batch'ler film sınırında kesilir
+        """
+        batch_texts = self.index_batch_texts()
+        batch = []
+        last_film = None
+        for doc in documents:
+            film = (doc['metadata']['title'], doc['metadata']['year'])
+            if len(batch) >= batch_texts and film != last_film:
+                yield self.build_index_rows(batch)
+                batch = []
+            batch.append(doc)
+            last_film = film
+        if batch:
+            yield self.build_index_rows(batch)
+
+    @metrics.timed("rag.setup_vector_database")
+    @holds_index
+    def setup_vector_database(self, documents: Iterable[Dict], incremental: bool = True,
+                              progress_callback: Optional[Callable[[Dict], None]] = None):
+        """
+        Dokümanları (liste ya da generator) vektör veritabanına akış halinde yazar: bu thread
+        bir batch'i encode ederken yazıcı thread bir öncekini indekse yazar.
+        incremental=True iken yalnızca yeni/değişen satırlar embed edilip upsert edilir, akış
+        bittiğinde artık bulunmayanlar silinir; False iken koleksiyon baştan oluşturulur.
+        progress_callback her batch'ten sonra bu thread'de {'processed', 'written'} ile çağrılır.
+        """
+        self.open_collection(reset=not incremental)
+
+        existing_hashes = {}
+        if incremental:
+            existing = self._collection_call('get', include=['metadatas'])
+            for doc_id, metadata in zip(existing['ids'], existing['metadatas'] or []):
+                existing_hashes[doc_id] = (metadata or {}).get('content_hash')
+
+        progress = {'processed': 0, 'written': 0}
+        write_queue = queue.Queue(maxsize=self.write_queue_size)
+        write_errors = []
+
+        def write_batches():
+            while True:
+                batch = write_queue.get()
+                if batch is None:
+                    return
+                if write_errors:
+                    continue
+                try:
+                    self._collection_call('upsert', **batch)
+                    progress['written'] += len(batch['ids'])
+                    metrics.inc('indexed_rows_total', len(batch['ids']))
+                except Exception as e:
+                    write_errors.append(e)
+
+        writer = threading.Thread(target=write_batches, daemon=True)
+        writer.start()
+
+        seen_ids = set()
+        changed_ids = set()
+        watched_index = {}
+        lexical_index = BM25Index()
         try:
-            self.client.delete_collection("movies")
-        except Exception:
-            pass
-        self.collection = self.client.get_or_create_collection("movies")
-        if not documents:
-            return 0
-        
-        texts = [doc['text'] for doc in documents]
-        metadatas = [doc['metadata'] for doc in documents]
-        ids = [doc['id'] for doc in documents]
-        embeddings = self.embedding_model.encode(texts).tolist()
-        self.collection.add(
-            documents=texts,
-            metadatas=metadatas,
-            ids=ids,
-            embeddings=embeddings
-        )
-        return len(documents)
-    
-    def search_movies(self, query: str, n_results: int = 10) -> List[Dict]:
+            with self.embedding_cache.deferred_flush():
+                for docs_by_id in self.iter_index_batches(documents):
+                    if write_errors:
+                        break
+                    batch_rows = []
+                    for doc_id, row in docs_by_id.items():
+                        seen_ids.add(doc_id)
+                        self._add_watched(watched_index, row['metadata'])
+                        metadata = row['metadata']
+                        lexical_index.add(metadata['title'], metadata['year'], row.get('review', ''), metadata, doc_id)
+                        doc_hash = self.document_hash(row)
+                        if existing_hashes.get(doc_id) != doc_hash:
+                            changed_ids.add(doc_id)
+                            batch_rows.append(row)
+
+                    if batch_rows:
+                        with metrics.span("index.embed", rows=len(batch_rows)):
+                            embeddings = self.embed_index_rows(batch_rows)
+                        if not isinstance(self.collection, NumpyVectorStore):
+                            embeddings = embeddings.tolist()
+                        # Hash encode'dan sonra alınır: model ilk batch'te yüklenip yedeğe düştüyse gerçek adı içerir
+                        metadatas = [{**row['metadata'], 'content_hash': self.document_hash(row)} for row in batch_rows]
+                        # Kuyruk doluysa yazıcı yetişene kadar beklenir (bellek sınırı)
+                        write_queue.put({
+                            'documents': [row['text'] for row in batch_rows],
+                            'metadatas': metadatas,
+                            'ids': [row['id'] for row in batch_rows],
+                            'embeddings': embeddings
+                        })
+                    progress['processed'] += len(docs_by_id)
+                    if progress_callback:
+                        progress_callback(dict(progress))
+        finally:
+            write_queue.put(None)
+            writer.join()
+            # Yarıda kesilse bile indekse yazılmış olabilir
+            self.invalidate_search_cache()
+        if write_errors:
+            raise write_errors[0]
+
+        removed_ids = [doc_id for doc_id in existing_hashes if doc_id not in seen_ids]
+        for start in range(0, len(removed_ids), self.index_batch_size):
+            self._collection_call('delete', ids=removed_ids[start:start + self.index_batch_size])
+
+        self._set_watched_index(watched_index)
+        self.lexical_index = lexical_index
+        self.invalidate_search_cache()
+
+        self.last_sync_stats = {
+            'added': sum(1 for doc_id in changed_ids if doc_id not in existing_hashes),
+            'updated': sum(1 for doc_id in changed_ids if doc_id in existing_hashes),
+            'deleted': len(removed_ids),
+            'unchanged': len(seen_ids) - len(changed_ids),
+        }
+        if progress_callback:
+            progress_callback(dict(progress))
+        return len(seen_ids)
+
+    @staticmethod
+    def _add_watched(watched_index: Dict, metadata: Dict):
+        if not metadata.get('watched'):
+            return
+        key = (metadata['title'], metadata['year'])
+        if key not in watched_index:
+            watched_index[key] = {
+                'title': metadata['title'],
+                'year': metadata['year'],
+                'uri': metadata.get('uri', '')
+            }
+
+    @metrics.timed("rag.rebuild_watched_index")
+    def rebuild_watched_index(self, documents):
+        """
+        İzlenen filmlerin (başlık, yıl, Letterboxd URI) kümesini dokümanlardan yeniden kurar
+        """
+        watched_index = {}
+        for doc in documents:
+            self._add_watched(watched_index, doc['metadata'])
+        self._set_watched_index(watched_index)
+
+    def _set_watched_index(self, watched_index: Dict):
+        self.watched_index = watched_index
+        self.watched_exclusion_list = [f"{film['title']} ({film['year']})" for film in watched_index.values()]
+        self.watched_title_index = TitleIndex(watched_index.keys())
+
+    @staticmethod
+    def build_where_clause(filters: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        watched / min_rating / year_min filtrelerini vektör aramasına gönderilecek where koşuluna çevirir
+        """
+        filters = filters or {}
+        conditions = []
+        if filters.get('watched') is not None:
+            conditions.append({'watched': bool(filters['watched'])})
+        if filters.get('min_rating') is not None:
+            conditions.append({'rating': {'$gte': float(filters['min_rating'])}})
+        if filters.get('year_min') is not None:
+            conditions.append({'year': {'$gte': int(filters['year_min'])}})
+        if not conditions:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        return {'$and': conditions}
+
+    @metrics.timed("rag.search_movies")
+    @holds_index
+    def search_movies(self, query: str, n_results: int = 10, filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Aynı indeks sürümünde aynı (sorgu, filtre, n_results) için sonuç cache'ten döner;
+        encoder ve vektör deposuna gidilmez
+        """
         if not self.collection:
             return []
+
+        cache_key = (
+            self.index_version, query, json.dumps(filters or {}, sort_keys=True, default=str), n_results,
+            self.enable_query_augmentation, self.enable_lexical_search
+        )
+        cached = self.search_cache.get(cache_key)
+        metrics.inc('cache_lookups_total', cache='search', result='miss' if cached is None else 'hit')
+        if cached is None:
+            cached = self._search_movies(query, n_results, filters)
+            self.search_cache.set(cache_key, cached)
+        return [dict(movie) for movie in cached]
+
+    def _search_movies(self, query: str, n_results: int, filters: Optional[Dict]) -> List[Dict]:
+        lexical_results = []
+        title_matches = []
+        if self.enable_lexical_search and len(self.lexical_index):
+            with metrics.span("search.lexical"):
+                lexical_results = self.lexical_index.search(query, k=n_results * 2, filters=filters)
+                title_matches = self.lexical_index.title_matches(query)
+        query_embeddings = self.embed_query(query, title_matches)
         
-        # Query augmentation kullanılıyorsa, birden fazla sorgu oluştur
-        if self.enable_query_augmentation:
-            augmented_queries = self.augment_query(query)
-            # Her augment edilmiş sorgu için embedding oluştur
-            query_embeddings = self.embedding_model.encode(augmented_queries).tolist()
-        else:
-            query_embeddings = self.embedding_model.encode([query]).tolist()
-        
+        # Filtreler aramanın içine gömülür; dönen her sonuç filtreyi zaten sağlar
+        where = self.build_where_clause(filters)
+
+        # Bellek içi motor, tüm sorguları tek matris çarpımıyla skorlar ve filmleri kendi tekilleştirir
+        if isinstance(self.collection, NumpyVectorStore):
+            similar = self._collection_call('search_films', query_embeddings=query_embeddings, n_results=n_results * 2, where=where)
+            all_movies = [
+                {
+                    'title': metadata['title'],
+                    'year': metadata['year'],
+                    'rating': metadata['rating'],
+                    'watched': metadata['watched']
+                }
+                for metadata in similar
+            ]
+            all_movies = self.fuse_results(all_movies, lexical_results, n_results * 2)
+            return sorted(all_movies, key=lambda x: x.get('rating', 0.0), reverse=True)[:n_results]
+
         # Tüm augment edilmiş sorgular için arama yap
-        results = self.collection.query(
+        results = self._collection_call(
+            'query',
             query_embeddings=query_embeddings,
-            n_results=n_results * 2  # Daha fazla sonuç al, sonra unique'leştir
+            n_results=n_results * 2,  # Daha fazla sonuç al, sonra unique'leştir
+            where=where
         )
         
         # Sonuçları birleştir ve unique'leştir (aynı film tekrar göstermesin)
         seen_movies = set()
-        movies = []
+        all_movies = []
         
         if results and results['ids']:
             # Tüm sorgu sonuçlarını birleştir
-            all_movies = []
             for query_idx in range(len(results['ids'])):
                 if results['ids'][query_idx]:
                     for i in range(len(results['ids'][query_idx])):
@@ -274,88 +962,330 @@ class MovieMindRAG:
                                 'rating': metadata['rating'],
                                 'watched': metadata['watched']
                             })
-            
-            # Rating'e göre sırala ve n_results kadar döndür
-            movies = sorted(all_movies, key=lambda x: x.get('rating', 0.0), reverse=True)[:n_results]
         
-        return movies
+        # Sözcüksel sonuçlarla birleştir, rating'e göre sırala ve n_results kadar döndür
+        all_movies = self.fuse_results(all_movies, lexical_results, n_results * 2)
+        return sorted(all_movies, key=lambda x: x.get('rating', 0.0), reverse=True)[:n_results]
 
-    def get_recommendations(self, query: str, filters: Dict):
-        if not self.gemini_model:
-            similar_movies = self.search_movies(query, n_results=10)
-            recommendations = "Gemini API key mevcut değil. Benzer filmler:\n"
-            for movie in similar_movies:
-                recommendations += f"- {movie['title']} ({movie['year']})\n"
-            return {'success': True, 'recommendations': recommendations, 'similar_movies_found': len(similar_movies)}
+    def embed_query(self, query: str, title_matches: Optional[List[Dict]] = None) -> List[List[float]]:
+        """
+        Sorgunun arama vektörlerini döndürür. Sorgu bir film başlığından ibaretse (title_matches)
+        o filmin indeksteki vektörleri kullanılır; sorgu genişletme ve embedding modeli atlanır.
+        """
+        if title_matches:
+            row_ids = [row_id for film in title_matches for row_id in film['row_ids']]
+            stored = self._collection_call('get', ids=row_ids, include=['embeddings'])
+            if len(stored['ids']):
+                metrics.inc('lexical_shortcuts_total')
+                return np.asarray(stored['embeddings'], dtype=np.float32).tolist()
 
-        # Önce tüm filmlerden benzer olanları bul
-        all_similar_movies = self.search_movies(query, n_results=50)
-        
-        # İzlenmiş filmleri filtrele (bunlar referans olacak)
-        watched_movies_for_ai = [
-            movie for movie in all_similar_movies 
-            if movie['watched'] == True and movie['rating'] >= filters.get('min_rating', 0.0) and movie['year'] >= filters.get('year_min', 1900)
+        cache_key = (self.embedding_model_name, query, self.enable_query_augmentation)
+        embeddings = self.query_cache.get(cache_key)
+        metrics.inc('cache_lookups_total', cache='query_embedding', result='miss' if embeddings is None else 'hit')
+        if embeddings is not None:
+            return embeddings
+
+        # Query augmentation kullanılıyorsa, birden fazla sorgu oluştur
+        if self.enable_query_augmentation:
+            with metrics.span("search.augment_query"):
+                augmented_queries = self.augment_query(query)
+            # Her augment edilmiş sorgu için embedding oluştur (tek batch)
+            embeddings = self.encode_texts(augmented_queries).tolist()
+        else:
+            embeddings = self.encode_texts([query]).tolist()
+        # Model bu çağrıda yüklenip yedeğe düşmüş olabilir; anahtar gerçek model adıyla yazılır
+        self.query_cache.set((self.embedding_model_name, query, self.enable_query_augmentation), embeddings)
+        return embeddings
+
+    def fuse_results(self, vector_movies: List[Dict], lexical_results: List[Dict], limit: int) -> List[Dict]:
+        """
+        Vektör ve BM25 sıralamalarını reciprocal-rank fusion ile birleştirip ilk limit filmi döndürür
+        """
+        if not lexical_results:
+            return vector_movies[:limit]
+        movies = {}
+        vector_keys = []
+        for movie in vector_movies:
+            key = (movie['title'], movie['year'])
+            movies.setdefault(key, movie)
+            vector_keys.append(key)
+        lexical_keys = []
+        for result in lexical_results:
+            metadata = result['film']['metadata']
+            key = (metadata['title'], metadata['year'])
+            movies.setdefault(key, dict(metadata))
+            lexical_keys.append(key)
+        ranking = reciprocal_rank_fusion([vector_keys, lexical_keys], k=self.rrf_k)
+        return [movies[key] for key in ranking[:limit]]
+
+    def get_candidate_catalog(self) -> Optional[CandidateCatalog]:
+        """
+        Aday film kataloğunu ilk kullanımda embed eder; dosya ya da embedding modeli değişince yeniden kurar
+        """
+        if not os.path.exists(self.catalog_path):
+            return None
+        key = (self.catalog_path, os.path.getmtime(self.catalog_path), self.embedding_model_name)
+        if self._catalog_key != key:
+            with metrics.span("recommender.build_catalog"):
+                self.candidate_catalog = CandidateCatalog.from_csv(self.catalog_path, self.encode_texts)
+            self._catalog_key = (self.catalog_path, os.path.getmtime(self.catalog_path), self.embedding_model_name)
+        return self.candidate_catalog
+
+    def taste_profile(self, min_rating: float = 0.0) -> Optional[Dict]:
+        """
+        İzlenen (ve min_rating'i geçen) filmlerin indeksteki vektörlerinden puan ağırlıklı zevk vektörü.
+        Bir filmin satırları (varyasyonları) tek vektörde ortalanır. İndeks değişene kadar cache'lenir;
+        'films' puana göre sıralı referans filmleri içerir.
+        """
+        if min_rating in self._taste_profiles:
+            return self._taste_profiles[min_rating]
+        stored = self._collection_call(
+            'get',
+            where=self.build_where_clause({'watched': True, 'min_rating': min_rating}),
+            include=['embeddings', 'metadatas']
+        )
+        if not len(stored['ids']):
+            return None
+
+        vectors = normalize_rows(stored['embeddings'])
+        film_rows = {}
+        for row, metadata in enumerate(stored['metadatas']):
+            film_rows.setdefault((metadata['title'], metadata['year']), (metadata, []))[1].append(row)
+        films = [metadata for metadata, _ in film_rows.values()]
+        film_vectors = np.vstack([vectors[rows].mean(axis=0) for _, rows in film_rows.values()])
+
+        profile = {
+            'vector': build_taste_vector(film_vectors, [film['rating'] for film in films]),
+            'films': sorted(
+                ({'title': film['title'], 'year': film['year'], 'rating': film['rating'], 'watched': True} for film in films),
+                key=lambda x: x['rating'], reverse=True
+            ),
+        }
+        self._taste_profiles[min_rating] = profile
+        return profile
+
+    def is_excluded(self, title: str, year: int) -> bool:
+        return (
+            self.watched_title_index.contains(title, year)
+            or self.export_watched_title_index.contains(title, year)
+            or self.watchlist_title_index.contains(title, year)
+        )
+
+    @metrics.timed("rag.recommend_local")
+    @holds_index
+    def recommend_local(self, query: str, filters: Optional[Dict] = None, n_results: Optional[int] = None) -> Dict:
+        """
+        Zevk vektörü ile sorgu vektörünün ağırlıklı toplamına en yakın, izlenmemiş ve izleme listesinde
+        olmayan katalog filmlerini döndürür. Her iki benzerlik de kosinüs olduğundan birleşik skor tek
+        bir en yakın komşu aramasıyla hesaplanır; LLM çağrısı yapılmaz.
+        """
+        filters = filters or {}
+        if not self.collection:
+            return {'success': False, 'error': "Önce veriyi yükleyin!"}
+        catalog = self.get_candidate_catalog()
+        if catalog is None or not len(catalog):
+            return {'success': False, 'error': f"Aday film kataloğu bulunamadı: {self.catalog_path}"}
+        started = time.perf_counter()
+        profile = self.taste_profile(filters.get('min_rating', 0.0))
+        if profile is None:
+            return {'success': False, 'error': "İzlediğiniz film bulunamadı. Lütfen önce veri yükleyin."}
+
+        title_matches = self.lexical_index.title_matches(query) if self.enable_lexical_search and len(self.lexical_index) else []
+        query_vector = normalize_rows(normalize_rows(self.embed_query(query, title_matches)).mean(axis=0))[0]
+        combined = (1 - self.query_weight) * profile['vector'] + self.query_weight * query_vector
+
+        with metrics.span("recommender.search", catalog=len(catalog)):
+            results = catalog.search(
+                combined, k=n_results or self.local_candidate_count,
+                exclude=self.is_excluded, year_min=filters.get('year_min')
+            )
+        if not results:
+            return {'success': False, 'error': "Filtrelere uyan, izlenmemiş bir aday film bulunamadı."}
+
+        candidates = []
+        for result in results:
+            vector = catalog.vectors[result['row']]
+            candidates.append({
+                'title': result['film']['title'],
+                'year': result['film']['year'],
+                'score': round(result['score'], 4),
+                'taste_similarity': round(float(vector @ profile['vector']), 4),
+                'query_similarity': round(float(vector @ query_vector), 4),
+            })
+        return {
+            'success': True,
+            'recommendations': self.format_local_recommendations(query, candidates[:self.max_recommendations]),
+            'candidates': candidates,
+            'reference_movies': profile['films'],
+            'similar_movies_found': len(profile['films']),
+            'engine': 'local',
+            'local_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    @staticmethod
+    def format_local_recommendations(query: str, candidates: List[Dict]) -> str:
+        lines = [
+            "**Beğendiğiniz filmlerden yola çıkarak:**",
+            f"Puanlarınızdan çıkarılan zevk profilinize ve \"{query}\" isteğinize en yakın, henüz izlemediğiniz filmler:",
+            "",
+            "**Önerilerim:**",
         ]
+        lines += [
+            f"- {movie['title']} ({movie['year']}): zevk uyumu {movie['taste_similarity']:.2f} · istek uyumu {movie['query_similarity']:.2f}"
+            for movie in candidates
+        ]
+        return '\n'.join(lines)
+
+    def build_rerank_prompt(self, query: str, top_movies: List[Dict], candidates: List[Dict], count: str) -> str:
+        return f"""
+        Kullanıcı "{query}" türünde film önerileri istiyor.
+        Kullanıcının en yüksek puan verdiği filmlerden bazıları:
+        {chr(10).join([f"- {movie['title']} ({movie['year']}) - Puan: {movie['rating']}/5" for movie in top_movies])}
+
+        Aşağıdaki aday filmler kullanıcının zevk profiline ve isteğine göre seçildi; hiçbirini henüz izlemedi:
+        {chr(10).join([f"{i}. {movie['title']} ({movie['year']})" for i, movie in enumerate(candidates, 1)])}
+
+        Bu adaylar arasından kullanıcıya en uygun {count} adet filmi seç, en uygundan başlayarak sırala
+        ve her biri için kullanıcının sevdiği filmlere değinen kısa bir açıklama yaz.
+        Aday listesinde olmayan hiçbir filmi önerme.
+
+        Önerilerini şu formatta sun:
+        **Beğendiğiniz filmlerden yola çıkarak:**
+        [Kısa bir giriş cümlesi]
+
+        **Önerilerim:**
+        - [Film Adı] ([Yıl]): [Kısa açıklama]
+        - [Film Adı] ([Yıl]): [Kısa açıklama]
+        - ...
+        """
+
+    @metrics.timed("rag.rerank_with_gemini")
+    def rerank_with_gemini(self, query: str, local: Dict, on_token=None, cancel_event=None) -> Dict:
+        """
+        Yerel adayları Gemini'ye yeniden sıralatıp açıklatır. Yanıttaki aday listesi dışındaki
+        filmler atılır; yeterli öneri kalmazsa yerel sıralamadaki adaylarla tamamlanır.
+        on_token yalnızca cache'ten dönen (süzülmüş) yanıtı alır.
+        """
+        candidates = local['candidates']
+        top_movies = local['reference_movies'][:5]
+        labels = [f"{movie['title']} ({movie['year']})" for movie in candidates]
+
+        model_name = getattr(self.gemini_model, 'model_name', type(self.gemini_model).__name__)
+        cache_key = response_cache_key(query, top_movies, labels, f"{model_name}|rerank")
+        cached = self.response_cache.get(cache_key)
+        metrics.inc('cache_lookups_total', cache='response', result='miss' if cached is None else 'hit')
+        if cached is not None:
+            if on_token:
+                on_token(cached)
+            return {**local, 'recommendations': cached, 'engine': 'local+gemini', 'cached': True}
 
-        # Eğer izlenmiş benzer film yoksa, tüm izlenmiş filmlerden yola çık
-        if not watched_movies_for_ai:
-            # Tüm izlenmiş filmleri al
-            all_watched_results = self.collection.query(
-                query_texts=[query], 
-                n_results=100, 
-                where={"watched": True}
+        prompt = self.build_rerank_prompt(query, top_movies, candidates, f"{self.min_recommendations}-{self.max_recommendations}")
+        stats = {'prompt_tokens': estimate_tokens(prompt), 'llm_calls': 1}
+        started = time.perf_counter()
+        try:
+            # Ham yanıt akıtılmaz: aday listesi dışındaki satırlar aşağıda atılır
+            text = self._generate(prompt, cancel_event=cancel_event)
+        except GenerationCancelled:
+            return {'success': False, 'error': "Öneri üretimi iptal edildi."}
+        except GenerationTimeout:
+            return {'success': False, 'error': f"Gemini yanıtı {self.generation_timeout:g} saniye içinde tamamlanmadı."}
+        except Exception as e:
+            return {'success': False, 'error': f"Gemini modelinden öneri alınamadı: {e}"}
+        stats['generation_seconds'] = round(time.perf_counter() - started, 3)
+
+        # Her yanıt satırı (bulanık başlık eşleşmesiyle) hangi adaya karşılık geliyor
+        candidate_indexes = [TitleIndex([(movie['title'], movie['year'])]) for movie in candidates]
+        accepted, chosen, rejected = [], set(), 0
+        for recommendation in parse_recommendations(text):
+            matched = next(
+                (i for i, index in enumerate(candidate_indexes) if index.contains(recommendation['title'], recommendation['year'])),
+                None
             )
-            
-            if all_watched_results and all_watched_results['metadatas']:
-                watched_movies_for_ai = []
-                for i, metadata in enumerate(all_watched_results['metadatas'][0]):
-                    if metadata.get('rating', 0) >= filters.get('min_rating', 0.0) and metadata.get('year', 0) >= filters.get('year_min', 1900):
-                        watched_movies_for_ai.append({
-                            'title': metadata['title'],
-                            'year': metadata['year'],
-                            'rating': metadata['rating'],
-                            'watched': metadata['watched']
-                        })
+            if matched is None:
+                rejected += 1
+            elif matched not in chosen and len(accepted) < self.max_recommendations:
+                accepted.append(recommendation['line'])
+                chosen.add(matched)
+        if not accepted:
+            return {'success': False, 'error': "Gemini aday listesinden bir film seçmedi.", 'filtered_out': rejected, **stats}
+
+        local_lines = self.format_local_recommendations(query, candidates).split("**Önerilerim:**")[1].strip().split('\n')
+        for i, line in enumerate(local_lines):
+            if len(accepted) >= self.min_recommendations:
+                break
+            if i not in chosen:
+                accepted.append(line)
+
+        intro = text.split("**Önerilerim:**")[0].strip() if "**Önerilerim:**" in text else ''
+        recommendations = '\n'.join(([intro, ''] if intro else []) + ["**Önerilerim:**", *accepted])
+        self.response_cache.set(cache_key, recommendations)
+        return {**local, 'recommendations': recommendations, 'engine': 'local+gemini', 'filtered_out': rejected, **stats}
 
-        return self.generate_recommendations_from_watched(query, watched_movies_for_ai)
+    @metrics.timed("rag.get_recommendations")
+    @holds_index
+    def get_recommendations(self, query: str, filters: Dict, on_token=None, cancel_event=None):
+        """
+        Varsayılan ("local") akışta öneriler yerel motordan gelir ve Gemini yalnızca yeniden sıralama
+        ile açıklama ekler; Gemini başarısız olursa yerel öneriler döner. Aday kataloğu yoksa,
+        filtrelerden sonra katalogda min_recommendations'tan az aday kalıyorsa ya da recommender
+        "gemini" ise öneriler Gemini ile üretilir; Gemini anahtarı yoksa benzer izlenmiş filmler listelenir.
+        """
+        if self.recommender == "local" and self.get_candidate_catalog() is not None:
+            local = self.recommend_local(query, filters)
+            enough = local['success'] and len(local['candidates']) >= self.min_recommendations
+            if not self.gemini_model and enough:
+                return local
+            if enough:
+                if not self.enable_llm_rerank:
+                    return local
+                reranked = self.rerank_with_gemini(query, local, on_token=on_token, cancel_event=cancel_event)
+                if reranked['success']:
+                    return reranked
+                return {**local, 'rerank_error': reranked['error']}
 
-    def generate_recommendations_from_watched(self, query: str, watched_movies: List[Dict]):
         if not self.gemini_model:
-            return {'success': False, 'error': "Gemini modeli başlatılamadı."}
+            similar_movies = self.search_movies(query, n_results=10)
+            recommendations = "Gemini API key mevcut değil. Benzer filmler:\n"
+            for movie in similar_movies:
+                recommendations += f"- {movie['title']} ({movie['year']})\n"
+            return {'success': True, 'recommendations': recommendations, 'similar_movies_found': len(similar_movies)}
 
-        if not watched_movies:
-            return {'success': False, 'error': "İzlediğiniz film bulunamadı. Lütfen önce veri yükleyin."}
+        # Referans olacak izlenmiş filmleri, puan/yıl filtreleri arama içinde uygulanarak tek seferde bul
+        reference_filters = {
+            'watched': True,
+            'min_rating': filters.get('min_rating', 0.0),
+            'year_min': filters.get('year_min', 1900)
+        }
+        watched_movies_for_ai = self.search_movies(query, n_results=50, filters=reference_filters)
 
-        top_movies = sorted(watched_movies, key=lambda x: x.get('rating', 0.0), reverse=True)[:5]
-        avg_user_rating = sum(movie.get('rating', 0.0) for movie in top_movies) / len(top_movies) if top_movies else 0.0
+        return self.generate_recommendations_from_watched(
+            query, watched_movies_for_ai, on_token=on_token, cancel_event=cancel_event
+        )
 
-        watched_titles = [f"{movie['title']} ({movie['year']})" for movie in watched_movies]
-        
-        all_watched_titles_from_db = []
-        if self.collection:
-            results = self.collection.query(
-                query_texts=["watched movies"], 
-                n_results=1000, 
-                where={"watched": True}
-            )
-            if results and results['metadatas']:
-                for metadata in results['metadatas'][0]:
-                    all_watched_titles_from_db.append(f"{metadata['title']} ({metadata['year']})")
+    def build_recommendation_prompt(self, query: str, top_movies: List[Dict], excluded_titles: List[str], count: str) -> str:
+        avg_user_rating = sum(movie.get('rating', 0.0) for movie in top_movies) / len(top_movies) if top_movies else 0.0
 
-        all_watched_text = list(set(watched_titles + all_watched_titles_from_db))
+        if self.prompt_mode == "bounded":
+            exclusion_block = "Kullanıcının zaten izlediği filmleri önermemeye özen göster."
+            if excluded_titles:
+                exclusion_block += f"""
+        Şu filmleri KESINLIKLE önerme:
+        {chr(10).join(excluded_titles)}"""
+        else:
+            exclusion_block = f"""🚨 KRITIK UYARI: Aşağıdaki filmleri KESINLIKLE önerme (kullanıcı zaten izlemiş):
+        {chr(10).join(excluded_titles)}
+        Bu listedeki HİÇBİR filmi önerme! Sadece bu listede olmayan filmler öner."""
 
-        prompt = f"""
+        return f"""
         Kullanıcı "{query}" türünde film önerileri istiyor.
         Kullanıcının izlediği ve beğendiği filmlerden bazıları (ortalama puanı {avg_user_rating:.1f}/5):
         {chr(10).join([f"- {movie['title']} ({movie['year']}) - Puan: {movie['rating']}/5" for movie in top_movies])}
 
-        Bu filmlerden yola çıkarak, kullanıcının sevebileceği, henüz izlemediği 3-5 adet film önerisi yap.
+        Bu filmlerden yola çıkarak, kullanıcının sevebileceği, henüz izlemediği {count} adet film önerisi yap.
         Önerilerini yaparken, kullanıcının izlediği filmlerin tarzını, türünü ve genel beğenisini göz önünde bulundur.
         Önerilerini kısa ve öz açıklamalarla birlikte sun.
 
-        🚨 KRITIK UYARI: Aşağıdaki filmleri KESINLIKLE önerme (kullanıcı zaten izlemiş):
-        {chr(10).join(all_watched_text)}
-        Bu listedeki HİÇBİR filmi önerme! Sadece bu listede olmayan filmler öner.
+        {exclusion_block}
 
         Önerilerini şu formatta sun:
         **Beğendiğiniz filmlerden yola çıkarak:**
@@ -366,11 +1296,114 @@ class MovieMindRAG:
         - [Film Adı] ([Yıl]): [Kısa açıklama]
         - ...
         """
+
+    @metrics.timed("llm.generate")
+    def _generate(self, prompt: str, on_token=None, cancel_event=None) -> str:
+        if self.rate_limiter is not None:
+            with metrics.span("llm.rate_limit_wait"):
+                self.rate_limiter.acquire()
+        metrics.inc('llm_calls_total')
+        metrics.inc('prompt_tokens_total', estimate_tokens(prompt))
+        if self.enable_streaming:
+            return stream_generate(
+                self.gemini_model, prompt, on_token=on_token,
+                timeout=self.generation_timeout, cancel_event=cancel_event
+            )
+        response = self.gemini_model.generate_content(
+            prompt, request_options={'timeout': self.generation_timeout}
+        )
+        return response.text
+
+    def _generate_bounded(self, query: str, top_movies: List[Dict], cancel_event=None):
+        """
+        Sabit boyutlu prompt ile fazladan aday üretir, izlenen filmleri başlık indeksiyle eler;
+        yeterli öneri kalmazsa yalnızca elenen başlıkları dışlayarak yeniden sorar.
+        """
+        accepted, rejected = [], []
+        intro = ''
+        prompt_tokens = 0
+        llm_calls = 0
+        seen = set()
+        excluded = []
+
+        while llm_calls <= self.max_reprompts:
+            needed = self.max_recommendations - len(accepted)
+            # İlk çağrı ayarlanan aday sayısını ister; yeniden sormalarda eksik kalanın iki katı istenir
+            count = max(self.bounded_candidate_count, needed) if llm_calls == 0 else needed * 2
+            prompt = self.build_recommendation_prompt(query, top_movies, excluded, str(count))
+            prompt_tokens += estimate_tokens(prompt)
+            llm_calls += 1
+            text = self._generate(prompt, cancel_event=cancel_event)
+
+            if not intro and "**Önerilerim:**" in text:
+                intro = text.split("**Önerilerim:**")[0].strip()
+            for candidate in parse_recommendations(text):
+                key = (candidate['title'].casefold(), candidate['year'])
+                if key in seen:
+                    continue
+                seen.add(key)
+                label = f"{candidate['title']} ({candidate['year']})"
+                if self.watched_title_index.contains(candidate['title'], candidate['year']):
+                    rejected.append(label)
+                    excluded.append(label)
+                elif len(accepted) < self.max_recommendations:
+                    accepted.append(candidate['line'])
+                    excluded.append(label)
+
+            if len(accepted) >= self.min_recommendations:
+                break
+
+        recommendations = '\n'.join(([intro, ''] if intro else []) + ["**Önerilerim:**", *accepted]) if accepted else ''
+        return recommendations, {'prompt_tokens': prompt_tokens, 'llm_calls': llm_calls, 'filtered_out': len(rejected)}
+
+    @metrics.timed("rag.generate_recommendations_from_watched")
+    def generate_recommendations_from_watched(self, query: str, watched_movies: List[Dict], on_token=None, cancel_event=None):
+        """
+        Gemini ile öneri üretir. on_token verilirse "full" modda yanıt parça parça iletilir (streaming);
+        cancel_event set edildiğinde üretim durur. Aynı (sorgu, ilk 5 film, izlenenler, model)
+        için önceki yanıt cache'ten döner.
+        """
+        if not self.gemini_model:
+            return {'success': False, 'error': "Gemini modeli başlatılamadı."}
+
+        if not watched_movies:
+            return {'success': False, 'error': "İzlediğiniz film bulunamadı. Lütfen önce veri yükleyin."}
+
+        top_movies = sorted(watched_movies, key=lambda x: x.get('rating', 0.0), reverse=True)[:5]
+
+        watched_titles = [f"{movie['title']} ({movie['year']})" for movie in watched_movies]
         
+        # İndeks kurulurken hazırlanan izlenenler listesi; sorgu/embedding gerekmez
+        all_watched_text = list(dict.fromkeys(watched_titles + self.watched_exclusion_list))
+
+        model_name = getattr(self.gemini_model, 'model_name', type(self.gemini_model).__name__)
+        cache_key = response_cache_key(query, top_movies, all_watched_text, f"{model_name}|{self.prompt_mode}")
+        cached = self.response_cache.get(cache_key)
+        metrics.inc('cache_lookups_total', cache='response', result='miss' if cached is None else 'hit')
+        if cached is not None:
+            if on_token:
+                on_token(cached)
+            return {'success': True, 'recommendations': cached, 'similar_movies_found': len(watched_movies), 'cached': True}
+
+        started = time.perf_counter()
         try:
-            response = self.gemini_model.generate_content(prompt)
-            recommendations = response.text
-            
-            return {'success': True, 'recommendations': recommendations, 'similar_movies_found': len(watched_movies)}
+            if self.prompt_mode == "bounded":
+                # Ham yanıtlar akıtılmaz: izlenen filmler yanıt geldikten sonra elenir ve yeniden sormalar eklenir
+                recommendations, stats = self._generate_bounded(query, top_movies, cancel_event=cancel_event)
+            else:
+                prompt = self.build_recommendation_prompt(query, top_movies, all_watched_text, "3-5")
+                stats = {'prompt_tokens': estimate_tokens(prompt), 'llm_calls': 1, 'filtered_out': 0}
+                recommendations = self._generate(prompt, on_token=on_token, cancel_event=cancel_event)
+            stats['generation_seconds'] = round(time.perf_counter() - started, 3)
+
+            if recommendations.strip():
+                self.response_cache.set(cache_key, recommendations)
+            elif self.prompt_mode == "bounded":
+                return {'success': False, 'error': "Gemini izlenmemiş bir film önerisi döndürmedi.", **stats}
+            return {'success': True, 'recommendations': recommendations, 'similar_movies_found': len(watched_movies), **stats}
+        except GenerationCancelled:
+            return {'success': False, 'error': "Öneri üretimi iptal edildi."}
+        except GenerationTimeout:
+            return {'success': False, 'error': f"Gemini yanıtı {self.generation_timeout:g} saniye içinde tamamlanmadı."}
         except Exception as e:
             return {'success': False, 'error': f"Gemini modelinden öneri alınamadı: {e}"}
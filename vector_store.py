@@ -0,0 +1,311 @@
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class NumpyVectorStore:
+    """
+    Kişisel kütüphane boyutları için bellek içi, tam (exact) kosinüs benzerliği arama motoru.
+    Chroma koleksiyonunun kullanılan alt kümesini (get/upsert/delete/query/count) taklit eder;
+    vektörler normalize edilmiş tek parça bir NumPy matrisinde, sık kullanılan metadata
+    alanları ise dizi (kolon) olarak tutulur. Bir satır birden fazla vektör taşıyabilir
+    (multi-vector); bu durumda satır skoru vektörlerinin en yüksek benzerliğidir (max-sim).
+    """
+
+    def __init__(self, name: str = "movies"):
+        self.name = name
+        self._ids: List[str] = []
+        self._id_to_row: Dict[str, int] = {}
+        self._documents: List[str] = []
+        self._metadatas: List[Dict] = []
+        self._row_vectors: List[np.ndarray] = []  # her satır için (k, d) normalize vektörler
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._row_starts = np.empty(0, dtype=np.int64)
+        self._vector_row = np.empty(0, dtype=np.int64)
+        self._vector_counts = np.empty(0, dtype=np.int64)
+        self._multi_vector = False
+        self._matrix_dirty = False
+        self._film_codes: Dict[tuple, int] = {}
+        self._film_keys: List[tuple] = []
+        self.film = np.empty(0, dtype=np.int64)
+        self.title = np.empty(0, dtype=object)
+        self.year = np.empty(0, dtype=np.int64)
+        self.rating = np.empty(0, dtype=np.float64)
+        self.watched = np.empty(0, dtype=bool)
+        self._sorted_columns = {}
+        self._columns_dirty = False
+        # Tembel yeniden kurulumlar eşzamanlı aramalarda yarım kalmış kolon/matris görülmesin diye kilitlenir
+        self._rebuild_lock = threading.Lock()
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def vector_count(self) -> int:
+        return sum(len(vectors) for vectors in self._row_vectors)
+
+    def nbytes(self) -> int:
+        self._ensure_matrix()
+        return int(self._matrix.nbytes)
+
+    def _ensure_matrix(self):
+        """
+        Satır vektörlerini satır sırasına göre tek parça matrise dizer (değişiklikten sonra ilk aramada)
+        """
+        if not self._matrix_dirty:
+            return
+        with self._rebuild_lock:
+            if self._matrix_dirty:
+                self._rebuild_matrix()
+
+    def _rebuild_matrix(self):
+        if self._row_vectors:
+            counts = np.array([len(vectors) for vectors in self._row_vectors], dtype=np.int64)
+            self._matrix = np.ascontiguousarray(np.vstack(self._row_vectors))
+            self._row_starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            self._vector_row = np.repeat(np.arange(len(counts)), counts)
+            self._vector_counts = counts
+            self._multi_vector = bool((counts > 1).any())
+        else:
+            self._matrix = np.empty((0, 0), dtype=np.float32)
+            self._row_starts = np.empty(0, dtype=np.int64)
+            self._vector_row = np.empty(0, dtype=np.int64)
+            self._vector_counts = np.empty(0, dtype=np.int64)
+            self._multi_vector = False
+        self._matrix_dirty = False
+
+    def _score_rows(self, queries: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """
+        Artan sırada verilen satırlar için (sorgu x satır) skor matrisini tek matris çarpımıyla hesaplar
+        """
+        self._ensure_matrix()
+        all_rows = len(rows) == len(self._ids)
+        if not self._multi_vector:
+            return queries @ (self._matrix if all_rows else self._matrix[rows]).T
+        if all_rows:
+            return np.maximum.reduceat(queries @ self._matrix.T, self._row_starts, axis=1)
+        row_mask = np.zeros(len(self._ids), dtype=bool)
+        row_mask[rows] = True
+        vector_scores = queries @ self._matrix[row_mask[self._vector_row]].T
+        counts = self._vector_counts[rows]
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        return np.maximum.reduceat(vector_scores, starts, axis=1)
+
+    @staticmethod
+    def _normalize(embeddings) -> np.ndarray:
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _film_code(self, metadata: Dict) -> int:
+        key = (metadata.get('title'), metadata.get('year'))
+        if key not in self._film_codes:
+            self._film_codes[key] = len(self._film_keys)
+            self._film_keys.append(key)
+        return self._film_codes[key]
+
+    def _ensure_columns(self):
+        """
+        Metadata kolonlarını değişiklikten sonraki ilk filtre/aramada bir kez yeniden kurar;
+        böylece batch batch yapılan upsert'ler her seferinde O(n) maliyet ödemez
+        """
+        if not self._columns_dirty:
+            return
+        with self._rebuild_lock:
+            if self._columns_dirty:
+                self._rebuild_columns()
+
+    def _rebuild_columns(self):
+        self.film = np.array([self._film_code(m) for m in self._metadatas], dtype=np.int64)
+        self.title = np.array([m.get('title', '') for m in self._metadatas], dtype=object)
+        self.year = np.array([m.get('year', -1) for m in self._metadatas], dtype=np.int64)
+        self.rating = np.array([m.get('rating', -1.0) for m in self._metadatas], dtype=np.float64)
+        self.watched = np.array([bool(m.get('watched', False)) for m in self._metadatas], dtype=bool)
+
+        # Aralık filtreleri için sıralı kolon indeksleri (searchsorted ile O(log n) sınır bulma)
+        self._sorted_columns = {}
+        for field in ('year', 'rating'):
+            column = getattr(self, field)
+            order = np.argsort(column, kind='stable')
+            self._sorted_columns[field] = (order, column[order])
+        self._columns_dirty = False
+
+    def _range_mask(self, field: str, op: str, value) -> np.ndarray:
+        order, values = self._sorted_columns[field]
+        side = 'left' if op in ('$gte', '$lt') else 'right'
+        position = np.searchsorted(values, value, side=side)
+        selected = order[position:] if op in ('$gt', '$gte') else order[:position]
+        mask = np.zeros(len(self._ids), dtype=bool)
+        mask[selected] = True
+        return mask
+
+    def upsert(self, ids: List[str], embeddings, metadatas: List[Dict], documents: Optional[List[str]] = None):
+        """
+        embeddings satır başına tek vektör (n x d) ya da satır başına vektör listesi (multi-vector) olabilir
+        """
+        if len(embeddings) and np.ndim(embeddings[0]) == 2:
+            row_vectors = [self._normalize(vectors) for vectors in embeddings]
+        else:
+            row_vectors = list(self._normalize(embeddings)[:, None, :]) if len(ids) else []
+        if documents is None:
+            documents = [''] * len(ids)
+
+        for i, doc_id in enumerate(ids):
+            row = self._id_to_row.get(doc_id)
+            if row is None:
+                self._id_to_row[doc_id] = len(self._ids)
+                self._ids.append(doc_id)
+                self._documents.append(documents[i])
+                self._metadatas.append(dict(metadatas[i]))
+                self._row_vectors.append(row_vectors[i])
+            else:
+                self._documents[row] = documents[i]
+                self._metadatas[row] = dict(metadatas[i])
+                self._row_vectors[row] = row_vectors[i]
+        self._matrix_dirty = True
+        self._columns_dirty = True
+
+    def add(self, ids: List[str], embeddings, metadatas: List[Dict], documents: Optional[List[str]] = None):
+        self.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+
+    def delete(self, ids: List[str]):
+        remove = {self._id_to_row[doc_id] for doc_id in ids if doc_id in self._id_to_row}
+        if not remove:
+            return
+        keep = [row not in remove for row in range(len(self._ids))]
+        self._ids = [doc_id for row, doc_id in enumerate(self._ids) if keep[row]]
+        self._documents = [doc for row, doc in enumerate(self._documents) if keep[row]]
+        self._metadatas = [meta for row, meta in enumerate(self._metadatas) if keep[row]]
+        self._row_vectors = [vectors for row, vectors in enumerate(self._row_vectors) if keep[row]]
+        self._id_to_row = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._matrix_dirty = True
+        self._columns_dirty = True
+
+    def _where_mask(self, where: Optional[Dict]) -> np.ndarray:
+        """
+        Chroma'nın where sözdiziminin ($and, $or, $eq, $ne, $gt, $gte, $lt, $lte, $in) bir alt kümesini uygular
+        """
+        mask = np.ones(len(self._ids), dtype=bool)
+        if not where:
+            return mask
+        self._ensure_columns()
+        for field, condition in where.items():
+            if field == '$and':
+                for sub in condition:
+                    mask &= self._where_mask(sub)
+                continue
+            if field == '$or':
+                any_mask = np.zeros(len(self._ids), dtype=bool)
+                for sub in condition:
+                    any_mask |= self._where_mask(sub)
+                mask &= any_mask
+                continue
+
+            column = getattr(self, field, None) if field in ('title', 'year', 'rating', 'watched') else None
+            if column is None:
+                column = np.array([m.get(field) for m in self._metadatas], dtype=object)
+            if not isinstance(condition, dict):
+                condition = {'$eq': condition}
+            for op, value in condition.items():
+                if field in self._sorted_columns and op in ('$gt', '$gte', '$lt', '$lte'):
+                    mask &= self._range_mask(field, op, value)
+                elif op == '$eq':
+                    mask &= column == value
+                elif op == '$ne':
+                    mask &= column != value
+                elif op == '$gt':
+                    mask &= column > value
+                elif op == '$gte':
+                    mask &= column >= value
+                elif op == '$lt':
+                    mask &= column < value
+                elif op == '$lte':
+                    mask &= column <= value
+                elif op == '$in':
+                    mask &= np.isin(column, list(value))
+                else:
+                    raise ValueError(f"Desteklenmeyen where operatörü: {op}")
+        return mask
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None, include: Optional[List[str]] = None) -> Dict:
+        include = include or ['metadatas', 'documents']
+        if ids is not None:
+            rows = [self._id_to_row[doc_id] for doc_id in ids if doc_id in self._id_to_row]
+        else:
+            rows = list(range(len(self._ids)))
+        if where:
+            mask = self._where_mask(where)
+            rows = [row for row in rows if mask[row]]
+
+        result = {'ids': [self._ids[row] for row in rows]}
+        if 'metadatas' in include:
+            result['metadatas'] = [self._metadatas[row] for row in rows]
+        if 'documents' in include:
+            result['documents'] = [self._documents[row] for row in rows]
+        if 'embeddings' in include:
+            # Multi-vector satırlar için vektörlerin normalize ortalaması döner
+            result['embeddings'] = self._normalize(
+                np.array([vectors.mean(axis=0) for vectors in (self._row_vectors[row] for row in rows)], dtype=np.float32)
+            ) if rows else np.empty((0, 0), dtype=np.float32)
+        return result
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict] = None) -> Dict:
+        """
+        Chroma uyumlu sorgu: her sorgu için en yakın n_results dokümanı döndürür
+        """
+        result = {'ids': [], 'metadatas': [], 'documents': [], 'distances': []}
+        queries = self._normalize(query_embeddings)
+        if not self._ids:
+            for _ in range(len(queries)):
+                for key in result:
+                    result[key].append([])
+            return result
+
+        candidates = np.flatnonzero(self._where_mask(where))
+        scores = self._score_rows(queries, candidates)
+        k = min(n_results, len(candidates))
+        for row_scores in scores:
+            if k == 0:
+                top = np.empty(0, dtype=np.int64)
+            else:
+                top = np.argpartition(-row_scores, k - 1)[:k]
+                top = top[np.argsort(-row_scores[top])]
+            rows = candidates[top]
+            result['ids'].append([self._ids[row] for row in rows])
+            result['metadatas'].append([self._metadatas[row] for row in rows])
+            result['documents'].append([self._documents[row] for row in rows])
+            result['distances'].append((1.0 - row_scores[top]).tolist())
+        return result
+
+    def search_films(self, query_embeddings, n_results: int = 10, where: Optional[Dict] = None) -> List[Dict]:
+        """
+        Tüm sorgu embedding'lerini tek matris çarpımıyla skorlar, her film için en yüksek skoru
+        alır ve argpartition ile en benzer n_results filmin metadatasını döndürür.
+        """
+        if not self._ids:
+            return []
+        candidates = np.flatnonzero(self._where_mask(where))
+        if len(candidates) == 0:
+            return []
+
+        self._ensure_columns()
+        queries = self._normalize(query_embeddings)
+        doc_scores = self._score_rows(queries, candidates).max(axis=0)
+
+        # Her film için en yüksek skorlu dokümanı seç (film koduna, sonra skora göre sırala)
+        film_of_candidate = self.film[candidates]
+        order = np.lexsort((-doc_scores, film_of_candidate))
+        _, first = np.unique(film_of_candidate[order], return_index=True)
+        best = order[first]
+        best_scores = doc_scores[best]
+
+        k = min(n_results, len(best))
+        top = np.argpartition(-best_scores, k - 1)[:k]
+        top = top[np.argsort(-best_scores[top])]
+        return [
+            {**self._metadatas[candidates[best[i]]], 'score': float(best_scores[i])}
+            for i in top
+        ]